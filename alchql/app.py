@@ -1,10 +1,19 @@
+import asyncio
+import json
 import re
 from contextlib import asynccontextmanager
 from inspect import isawaitable
 from typing import Any, Awaitable, Callable, Dict, List, Optional, Type, Union
 
 from graphene import Context
-from graphql import ExecutionResult, graphql
+from graphql import (
+    DocumentNode,
+    execute,
+    ExecutionResult,
+    GraphQLError,
+    parse,
+    validate,
+)
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, AsyncSessionTransaction
 from starlette.background import BackgroundTasks
 from starlette.requests import HTTPConnection, Request
@@ -14,11 +23,43 @@ from starlette_graphene3 import (
     _get_operation_from_request,
 )
 
+from .encoders import (
+    default_json_encoder,
+    ENCODE_CHUNK_SIZE,
+    encode_json,
+    JSONEncoder,
+)
+from .batching import SHARED_LOADERS_CONTEXT, SharedLoaders
+from .cache import CacheInfo, LRUCache
 from .extensions import Extension, ExtensionManager
+from .persisted_queries import (
+    InProcessPersistedQueryStore,
+    PersistedQueryError,
+    PersistedQueryStore,
+    resolve_persisted_query,
+)
 
 DEFAULT_GET = object()
+DEFAULT_PERSISTED_QUERIES = object()
+# parsed and validated documents kept by an app
+DOCUMENT_CACHE_SIZE = 1024
 
 QUERY_REGEX = re.compile(r"^\s*?(query)", flags=re.M)
+# operations of a batch, 0 disables batching
+MAX_BATCH_SIZE = 20
+
+
+def is_read_only(query: str) -> bool:
+    return QUERY_REGEX.search(query) is not None
+
+
+class OperationError(Exception):
+    """An operation answered with `content` without being executed."""
+
+    def __init__(self, content: dict, status_code: int):
+        super().__init__(content)
+        self.content = content
+        self.status_code = status_code
 
 
 class SessionQLApp(GraphQLApp):
@@ -31,6 +72,11 @@ class SessionQLApp(GraphQLApp):
         ] = DEFAULT_GET,
         extensions: List[Type[Extension]] = (),
         raise_exceptions: List[Type[Exception]] = (),
+        json_encoder: JSONEncoder = default_json_encoder,
+        encode_chunk_size: Optional[int] = ENCODE_CHUNK_SIZE,
+        persisted_queries: Optional[PersistedQueryStore] = DEFAULT_PERSISTED_QUERIES,
+        document_cache_size: int = DOCUMENT_CACHE_SIZE,
+        max_batch_size: int = MAX_BATCH_SIZE,
         *args,
         **kwargs,
     ):
@@ -60,56 +106,183 @@ class SessionQLApp(GraphQLApp):
 
         self.extensions = extensions or ()
         self.raise_exceptions = tuple(raise_exceptions) or ()
+        # content -> bytes, e.g. orjson.dumps
+        self.json_encoder = json_encoder
+        # list items encoded at once, other tasks run between the chunks
+        self.encode_chunk_size = encode_chunk_size
+        if persisted_queries is DEFAULT_PERSISTED_QUERIES:
+            persisted_queries = InProcessPersistedQueryStore()
+        # automatic persisted queries, None disables them
+        self.persisted_queries = persisted_queries
+        # (schema, query) -> parsed document or its parse and validation errors
+        self.document_cache = LRUCache(maxsize=document_cache_size)
+        self.max_batch_size = max_batch_size
         super().__init__(context_value=context_value, on_get=on_get, *args, **kwargs)
 
-    async def _handle_http_request(self, request: Request) -> JSONResponse:
+    async def _handle_http_request(self, request: Request) -> Response:
         try:
             operations = await _get_operation_from_request(request)
         except ValueError as e:
             return JSONResponse({"errors": [e.args[0]]}, status_code=400)
 
         if isinstance(operations, list):
+            if not self.max_batch_size:
+                return JSONResponse(
+                    {"errors": ["This server does not support batching"]},
+                    status_code=400,
+                )
+            if not operations or len(operations) > self.max_batch_size:
+                return JSONResponse(
+                    {"errors": [f"Batches hold 1 to {self.max_batch_size} operations"]},
+                    status_code=400,
+                )
+            return await self._handle_batch(request, operations)
+
+        return await self._handle_operation(request, operations)
+
+    async def _get_on_get(self, request: Request) -> Optional[Response]:
+        params = request.query_params
+        if "query" not in params and "extensions" not in params:
+            return await super()._get_on_get(request)
+
+        try:
+            operation = {
+                "query": params.get("query"),
+                "operationName": params.get("operationName"),
+                "variables": json.loads(params.get("variables") or "null"),
+                "extensions": json.loads(params.get("extensions") or "null"),
+            }
+        except ValueError:
             return JSONResponse(
-                {"errors": ["This server does not support batching"]}, status_code=400
+                {"errors": ["Query parameters are not valid JSON"]}, status_code=400
             )
-        else:
-            operation = operations
 
-        query = operation["query"]
-        variable_values = operation.get("variables")
-        operation_name = operation.get("operationName")
+        # GET responses may be cached, mutations are sent with POST
+        return await self._handle_operation(request, operation, read_only=True)
+
+    async def _get_query(self, operation: dict, read_only: bool = False) -> str:
+        if not isinstance(operation, dict):
+            raise OperationError({"errors": ["Operation must be an Object"]}, 400)
+
+        try:
+            query = await resolve_persisted_query(operation, self.persisted_queries)
+        except PersistedQueryError as e:
+            raise OperationError(e.format(), e.status_code)
+
+        if not isinstance(query, str):
+            raise OperationError({"errors": ["Query is missing"]}, 400)
+        if read_only and not is_read_only(query):
+            raise OperationError({"errors": ["Only queries can be sent with GET"]}, 405)
+        return query
 
-        is_ro_operation = QUERY_REGEX.search(query) is not None
+    async def _handle_operation(
+        self, request: Request, operation: dict, read_only: bool = False
+    ) -> Response:
+        try:
+            query = await self._get_query(operation, read_only)
+        except OperationError as e:
+            return JSONResponse(e.content, status_code=e.status_code)
 
         async with self._get_context_value(
             request
-        ) as context_value, self._get_transaction(is_ro_operation) as transaction:
+        ) as context_value, self._get_transaction(is_read_only(query)) as transaction:
             context_value.session = transaction.session
 
-            middleware = self.middleware or ()
-            extension_manager = ExtensionManager(self.extensions, context=context_value)
+            result = await self._execute_operation(context_value, query, operation)
+            if result.errors:
+                await transaction.rollback()
+
+            background = getattr(context_value, "background", None)
+
+        return await self._get_response(self._format_result(result), background)
+
+    async def _handle_batch(self, request: Request, operations: list) -> Response:
+        """
+        Operations of a batch share one session and their loaders, results
+        are returned in the order of the operations. Batches of queries run
+        concurrently on one connection, batches with mutations run one by
+        one in a transaction rolled back when any operation fails.
+        """
+        queries = []
+        for operation in operations:
+            try:
+                queries.append(await self._get_query(operation))
+            except OperationError as e:
+                queries.append(e)
+
+        is_ro_batch = all(
+            isinstance(query, OperationError) or is_read_only(query)
+            for query in queries
+        )
+        shared_loaders = SharedLoaders()
+        background = BackgroundTasks()
+
+        async with self._get_transaction(is_ro_batch) as transaction:
+
+            async def run(operation: dict, query: Union[str, OperationError]):
+                if isinstance(query, OperationError):
+                    return query
+                async with self._get_context_value(request) as context_value:
+                    context_value.session = transaction.session
+                    setattr(context_value, SHARED_LOADERS_CONTEXT, shared_loaders)
+
+                    result = await self._execute_operation(
+                        context_value, query, operation
+                    )
+                    tasks = getattr(context_value, "background", None)
+                    if tasks is not None:
+                        background.add_task(tasks)
+                    return result
+
+            if is_ro_batch:
+                results = await asyncio.gather(*map(run, operations, queries))
+            else:
+                results = [
+                    await run(operation, query)
+                    for operation, query in zip(operations, queries)
+                ]
+
+            if any(getattr(result, "errors", None) for result in results):
+                await transaction.rollback()
+
+        response = [
+            result.content
+            if isinstance(result, OperationError)
+            else self._format_result(result)
+            for result in results
+        ]
+        return await self._get_response(response, background)
 
-            with extension_manager.request():
-                result: ExecutionResult = await graphql(
+    async def _execute_operation(
+        self, context_value: Context, query: str, operation: dict
+    ) -> ExecutionResult:
+        middleware = self.middleware or ()
+        extension_manager = ExtensionManager(self.extensions, context=context_value)
+
+        with extension_manager.request():
+            document = self._get_document(query)
+            if isinstance(document, DocumentNode):
+                result = execute(
                     self.schema.graphql_schema,
-                    source=query,
+                    document,
                     context_value=context_value,
                     root_value=self.root_value,
                     middleware=(*middleware, *extension_manager.extensions),
-                    variable_values=variable_values,
-                    operation_name=operation_name,
+                    variable_values=operation.get("variables"),
+                    operation_name=operation.get("operationName"),
                     execution_context_class=self.execution_context_class,
                 )
+                if isawaitable(result):
+                    result = await result
+            else:
+                result = ExecutionResult(data=None, errors=document)
 
-            if result.errors:
-                await transaction.rollback()
-
-            extension_results = extension_manager.format()
-            if extension_results:
-                result.extensions = extension_results
-
-            background = getattr(context_value, "background", None)
+        extension_results = extension_manager.format()
+        if extension_results:
+            result.extensions = extension_results
+        return result
 
+    def _format_result(self, result: ExecutionResult) -> Dict[str, Any]:
         response: Dict[str, Any] = {"data": result.data}
         if result.errors:
             for error in result.errors:
@@ -125,13 +298,41 @@ class SessionQLApp(GraphQLApp):
             ]
         if result.extensions:
             response["extensions"] = result.extensions
+        return response
 
-        return JSONResponse(
-            response,
+    async def _get_response(self, content: Any, background=None) -> Response:
+        return Response(
+            await encode_json(content, self.json_encoder, self.encode_chunk_size),
             status_code=200,
+            media_type="application/json",
             background=background,
         )
 
+    def _get_document(self, query: str) -> Union[DocumentNode, List[GraphQLError]]:
+        """
+        Parsed and validated document of `query` or its errors. Both are kept
+        per schema and query text, repeated queries are not parsed and
+        validated again.
+        """
+        schema = self.schema.graphql_schema
+        key = (schema, query)
+        document = self.document_cache.get(key)
+        if document is not None:
+            return document
+
+        try:
+            document = parse(query)
+        except GraphQLError as error:
+            document = [error]
+        else:
+            document = validate(schema, document) or document
+
+        self.document_cache.set(key, document)
+        return document
+
+    def document_cache_info(self) -> CacheInfo:
+        return self.document_cache.info()
+
     @asynccontextmanager
     async def _get_context_value(self, request: HTTPConnection) -> Context:
         if callable(self.context_value):
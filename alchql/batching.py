@@ -1,4 +1,5 @@
 import re
+from typing import Dict, Hashable, Optional, Tuple
 
 from graphene import Dynamic, Field, ResolveInfo
 from graphene.types.objecttype import ObjectTypeMeta
@@ -6,6 +7,68 @@ from sqlalchemy import ForeignKey
 from sqlalchemy.orm import RelationshipProperty
 
 from .gql_fields import camel_to_snake
+from .loader_fk import BaseLoader
+from .query_helper import QueryHelper
+from .selection import get_selection_key
+
+# operations of one HTTP batch keep their loaders in a `SharedLoaders`
+SHARED_LOADERS_CONTEXT = "shared_loaders"
+
+
+class LoaderRegistry:
+    """
+    Loaders of one operation, `LoaderMiddleware` keeps it in `context.loaders`.
+    Loaders are created on first use, per relationship and selection.
+    """
+
+    def __init__(self, loader_classes: dict, session, operation=None):
+        self.loader_classes = loader_classes
+        self.session = session
+        self.operation = operation
+        self.loaders: Dict[Hashable, BaseLoader] = {}
+        # id of a parsed field -> the field and its selection key
+        self.selection_keys: Dict[int, tuple] = {}
+
+    def get_selection_key(self, field) -> Hashable:
+        # parsed fields are shared by all parents, the key is computed once
+        cached = self.selection_keys.get(id(field))
+        if cached is None:
+            # the field is kept along with its key, so its id is not reused
+            cached = self.selection_keys[id(field)] = (field, get_selection_key(field))
+        return cached[1]
+
+    def get(
+        self, key: Hashable, partition: Hashable, info: ResolveInfo
+    ) -> Tuple[BaseLoader, bool]:
+        """The loader of `key` for `partition` and whether it was just created."""
+        loader = self.loaders.get((key, partition))
+        if loader is not None:
+            return loader, False
+
+        loader = self.loaders[(key, partition)] = self.loader_classes[key](
+            self.session, info
+        )
+        return loader, True
+
+    def clear(self):
+        self.loaders.clear()
+        self.selection_keys.clear()
+
+    def __len__(self) -> int:
+        return len(self.loaders)
+
+
+class SharedLoaders:
+    """
+    Registry of the operations of one batch, set as `shared_loaders` on
+    their contexts. Fields with the same arguments and selection in
+    different operations load their rows with one query.
+    """
+
+    __slots__ = ("registry",)
+
+    def __init__(self):
+        self.registry: Optional[LoaderRegistry] = None
 
 
 def set_object_type(root, info: ResolveInfo):
@@ -34,23 +97,43 @@ def set_object_type(root, info: ResolveInfo):
     setattr(info.context, "object_types", types)
 
 
-def get_batch_resolver(relationship_prop: RelationshipProperty, single=False):
+def get_loader(
+    info: ResolveInfo, key: Hashable, args: dict, loader_strategy=None
+) -> BaseLoader:
+    """
+    Loader of `key` for the current field. Fields with the same arguments
+    and selection share one batch, e.g. the same field under every parent,
+    aliases selecting differently get their own loader and query.
+    """
+    registry: LoaderRegistry = info.context.loaders
+    field = QueryHelper.get_current_field(info)
+
+    partition = (loader_strategy, registry.get_selection_key(field))
+    loader, created = registry.get(key, partition, info)
+    if created:
+        loader.args = args
+        loader.strategy = loader_strategy
+
+    return loader
+
+
+def get_batch_resolver(
+    relationship_prop: RelationshipProperty, single=False, loader_strategy=None
+):
     async def resolve(root, info: ResolveInfo, **args):
         key = (
             relationship_prop.parent.entity,
             relationship_prop.mapper.entity,
             relationship_prop.key,
         )
-        _loader = info.context.loaders[key]
-
-        _loader.info = info
+        _loader = get_loader(info, key, args, loader_strategy)
         set_object_type(root, info)
 
         key = getattr(root, next(iter(relationship_prop.local_columns)).key)
         if not key:
             p = None
         else:
-            p = await _loader.load(key)
+            p = await _loader.load_page(key)
 
         if single:
             return p[0] if p else None
@@ -67,16 +150,14 @@ def get_fk_resolver(fk: ForeignKey, single=False):
             fk.constraint.referred_table,
             re.sub(r"_(?:id|pk)$", "", fk.parent.key),
         )
-        _loader = info.context.loaders[key]
-
-        _loader.info = info
+        _loader = get_loader(info, key, args)
         set_object_type(root, info)
 
         key = getattr(root, fk.parent.key)
         if not key:
             p = None
         else:
-            p = await _loader.load(key)
+            p = await _loader.load_page(key)
 
         if single:
             return p[0] if p else None
@@ -86,23 +167,21 @@ def get_fk_resolver(fk: ForeignKey, single=False):
     return resolve
 
 
-def get_fk_resolver_reverse(fk: ForeignKey, single=False):
+def get_fk_resolver_reverse(fk: ForeignKey, single=False, loader_strategy=None):
     async def resolve(root, info: ResolveInfo, **args):
         key = (
             fk.constraint.referred_table,
             fk.constraint.table,
             str(fk.constraint.table.fullname),
         )
-        _loader = info.context.loaders[key]
-
-        _loader.info = info
+        _loader = get_loader(info, key, args, loader_strategy)
         set_object_type(root, info)
 
         key = getattr(root, fk.column.key)
         if not key:
             p = None
         else:
-            p = await _loader.load(key)
+            p = await _loader.load_page(key)
 
         if single:
             return p[0] if p else None
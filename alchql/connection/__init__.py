@@ -1,2 +1,4 @@
 from .from_array_slice import connection_from_array_slice
 from .from_query import connection_from_query
+from .keyset import keyset_connection_from_query
+from .count import CachedCount, CappedCount, CountStrategy, EstimatedCount, ExactCount
@@ -0,0 +1,195 @@
+import json
+import logging
+import time
+from typing import Hashable, NamedTuple, Optional, Type
+
+import sqlalchemy as sa
+from graphene.types import ResolveInfo
+from graphql import get_named_type
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import DeclarativeMeta
+from sqlalchemy.sql import Select
+
+from . import from_query
+from ..cache import LRUCache
+from ..model_index import get_model_info
+from ..statement_stats import name_statement
+
+TOTAL_COUNTS_CONTEXT = "total_counts"
+
+
+class CountResult(NamedTuple):
+    value: int
+    # False for lower bounds and estimates
+    exact: bool
+    strategy: str
+
+
+class CountStrategy:
+    """
+    Computes `totalCount` of a connection from its filtered query.
+    """
+
+    name: str
+
+    async def count(
+        self,
+        session: AsyncSession,
+        query: Select,
+        model: Type[DeclarativeMeta],
+        info: ResolveInfo,
+    ) -> CountResult:
+        raise NotImplementedError
+
+
+class ExactCount(CountStrategy):
+    name = "exact"
+
+    async def count(self, session, query, model, info) -> CountResult:
+        count_query = from_query.get_count_query(query, model)
+        count_query = name_statement(count_query, "count", info)
+        value = (await session.execute(count_query)).scalar()
+        return CountResult(value, True, self.name)
+
+
+class CappedCount(CountStrategy):
+    """
+    Counts up to `limit` rows, a larger result is reported as `limit`
+    with `exact=False`, e.g. shown as "1000+".
+    """
+
+    name = "capped"
+
+    def __init__(self, limit: int = 1000):
+        self.limit = limit
+
+    async def count(self, session, query, model, info) -> CountResult:
+        only_q = (
+            query.with_only_columns(*get_model_info(model).primary_key)
+            .order_by(None)
+            .limit(self.limit + 1)
+        )
+        count_query = sa.select(sa.func.count()).select_from(only_q.alias())
+        count_query = name_statement(count_query, "count", info)
+        value = (await session.execute(count_query)).scalar()
+        if value > self.limit:
+            return CountResult(self.limit, False, self.name)
+        return CountResult(value, True, self.name)
+
+
+class EstimatedCount(CountStrategy):
+    """
+    Row estimate of the PostgreSQL planner, free of scans but only as good
+    as the table statistics. Other dialects use `fallback`.
+    """
+
+    name = "estimate"
+
+    def __init__(self, fallback: Optional[CountStrategy] = None):
+        self.fallback = fallback or ExactCount()
+
+    async def count(self, session, query, model, info) -> CountResult:
+        dialect = session.get_bind(mapper=model).dialect
+        if dialect.name != "postgresql":
+            return await self.fallback.count(session, query, model, info)
+
+        only_q = query.with_only_columns(*get_model_info(model).primary_key).order_by(
+            None
+        )
+        try:
+            compiled = only_q.compile(
+                dialect=dialect, compile_kwargs={"literal_binds": True}
+            )
+        except SQLAlchemyError:
+            # values without a literal form, e.g. arrays of custom types
+            logging.debug("Can not estimate %s", only_q, exc_info=True)
+            return await self.fallback.count(session, query, model, info)
+
+        connection = await session.connection()
+        plan = (
+            await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        return CountResult(int(plan[0]["Plan"]["Plan Rows"]), False, self.name)
+
+
+class CachedCount(CountStrategy):
+    """
+    Keeps results of `strategy` for `ttl` seconds, keyed by the connection
+    type, the statement shape of the filtered query and its bound values.
+    Values from the cache are reported with the `cached` strategy.
+    """
+
+    name = "cached"
+
+    def __init__(
+        self,
+        strategy: Optional[CountStrategy] = None,
+        ttl: float = 60,
+        maxsize: int = 1024,
+    ):
+        self.strategy = strategy or ExactCount()
+        self.ttl = ttl
+        self.cache = LRUCache(maxsize=maxsize)
+
+    async def count(self, session, query, model, info) -> CountResult:
+        key = self.get_key(query, info)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                expires, result = cached
+                if expires > time.monotonic():
+                    return result._replace(strategy=self.name)
+                self.cache.pop(key)
+
+        result = await self.strategy.count(session, query, model, info)
+        if key is not None:
+            self.cache.set(key, (time.monotonic() + self.ttl, result))
+        return result
+
+    @staticmethod
+    def get_key(query: Select, info: ResolveInfo) -> Optional[Hashable]:
+        cache_key = query._generate_cache_key()
+        if cache_key is None:
+            return None
+
+        return (
+            get_named_type(info.return_type).name,
+            cache_key.key,
+            tuple(_to_hashable(i.effective_value) for i in cache_key.bindparams),
+        )
+
+
+def _to_hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_to_hashable(i) for i in value)
+    return value
+
+
+exact_count = ExactCount()
+
+
+async def get_total_count(
+    session: AsyncSession,
+    query: Select,
+    model: Type[DeclarativeMeta],
+    info: ResolveInfo,
+    strategy: Optional[CountStrategy] = None,
+) -> int:
+    result = await (strategy or exact_count).count(session, query, model, info)
+    record_total_count(info, result)
+    return result.value
+
+
+def record_total_count(info: ResolveInfo, result: CountResult):
+    """Keeps the result for `TotalCountExtension`, by response path."""
+    counts = getattr(info.context, TOTAL_COUNTS_CONTEXT, None)
+    if counts is None:
+        counts = {}
+        setattr(info.context, TOTAL_COUNTS_CONTEXT, counts)
+
+    path = ".".join(str(i) for i in info.path.as_list())
+    counts[path] = result
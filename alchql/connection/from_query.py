@@ -8,23 +8,49 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeMeta
 from sqlalchemy.sql import Select
 
+from .count import (
+    CountResult,
+    CountStrategy,
+    exact_count,
+    ExactCount,
+    get_total_count,
+    record_total_count,
+)
+from .streaming import result_partitions
 from .utils import (
     get_offset_with_default,
     offset_to_cursor,
 )
+from ..model_index import get_model_info
 from ..query_helper import QueryHelper
-from ..utils import filter_requested_fields_for_object
+from ..statement_stats import name_statement
+from ..projection import get_projection
 
 DEFAULT_LIMIT = 1000
+TOTAL_COUNT_LABEL = "_total_count"
+# first versions running `count(*) OVER ()`, other dialects are assumed to have it
+WINDOW_FUNCTIONS_SINCE = {
+    "sqlite": (3, 25),
+    "mysql": (8,),
+    "mariadb": (10, 2),
+}
 
 
 def get_count_query(query: Select, model):
     only_q = query.with_only_columns(
-        *sa.inspect(model).primary_key,
+        *get_model_info(model).primary_key,
     ).order_by(None)
     return sa.select(sa.func.count()).select_from(only_q.alias())
 
 
+def supports_window_functions(session: AsyncSession, model) -> bool:
+    dialect = session.get_bind(mapper=model).dialect
+    name = "mariadb" if getattr(dialect, "is_mariadb", False) else dialect.name
+    since = WINDOW_FUNCTIONS_SINCE.get(name)
+    version = dialect.server_version_info
+    return since is None or version is None or tuple(version) >= since
+
+
 def construct_page_info(
     cls: Type[PageInfo],
     info: ResolveInfo,
@@ -59,6 +85,9 @@ async def connection_from_query(
     info: ResolveInfo,
     args: Optional[dict] = None,
     connection_type: Type[Connection] = Connection,
+    window_count: bool = False,
+    count_strategy: Optional[CountStrategy] = None,
+    yield_per: Optional[int] = None,
 ) -> Connection:
     """
     Given a slice (subset) of an array, returns a connection object for use in
@@ -67,6 +96,14 @@ async def connection_from_query(
     cases where you know the cardinality of the connection, consider it too large
     to materialize the entire array, and instead wish pass in a slice of the
     total result large enough to cover the range specified in `args`.
+
+    With `window_count`, a selected `totalCount` is read from `count(*) OVER ()`
+    of the page query instead of a separate count query, when the dialect
+    supports it and the offsets do not depend on the count.
+    `count_strategy` computes a `totalCount` the offsets do not depend on,
+    by default the exact count.
+    With `yield_per`, rows are streamed and converted to edges in chunks
+    of that size instead of buffering the whole page first.
     """
     args = args or {}
     session: AsyncSession = info.context.session
@@ -94,12 +131,27 @@ async def connection_from_query(
         logging.warning(f"Query without border, {first=}")
 
     total_count = None
+    count_in_page = False
     # TODO: Move total_count to PageInfo
-    if (last and not before) or (after and not first and not before) or has_total_count:
-        count_query = get_count_query(query, model)
-        right_offset = total_count = (await session.execute(count_query)).scalar()
+    if (last and not before) or (after and not first and not before):
+        result = await exact_count.count(session, query, model, info)
+        right_offset = total_count = result.value
+        if has_total_count:
+            record_total_count(info, result)
     else:
         right_offset = get_offset_with_default(before)
+        if has_total_count:
+            # DISTINCT is applied after the window, it would count duplicates
+            count_in_page = (
+                window_count
+                and (count_strategy is None or isinstance(count_strategy, ExactCount))
+                and not query._distinct
+                and supports_window_functions(session, model)
+            )
+            if not count_in_page:
+                total_count = await get_total_count(
+                    session, query, model, info, count_strategy
+                )
 
     left_offset = get_offset_with_default(after) + 1 if after else 0
 
@@ -116,16 +168,35 @@ async def connection_from_query(
         _slice = _slice.limit(limit + 1)
     if left_offset:
         _slice = _slice.offset(left_offset)
+    if count_in_page:
+        _slice = _slice.add_columns(
+            sa.func.count().over().label(TOTAL_COUNT_LABEL),
+        )
+    _slice = name_statement(_slice, "connection", info)
 
     edges = []
 
-    for i, v in enumerate(await session.execute(_slice)):
-        node_value = filter_requested_fields_for_object(dict(v), node_type)
-        edge = edge_type(
-            node=node_type(**node_value),
-            cursor=offset_to_cursor(left_offset + i),
-        )
-        edges.append(edge)
+    async with result_partitions(session, _slice, yield_per) as (columns, partitions):
+        projection = get_projection(columns, node_type, exclude=(TOTAL_COUNT_LABEL,))
+        if count_in_page:
+            total_count_index = columns.index(TOTAL_COUNT_LABEL)
+
+        async for rows in partitions:
+            if count_in_page and rows:
+                total_count = rows[0][total_count_index]
+            offset = left_offset + len(edges)
+            edges.extend(
+                edge_type(node=projection(row), cursor=offset_to_cursor(offset + i))
+                for i, row in enumerate(rows)
+            )
+
+    if count_in_page:
+        if edges or not left_offset:
+            total_count = total_count or 0
+            record_total_count(info, CountResult(total_count, True, "window"))
+        else:
+            # the page is past the end, the window had no rows to count
+            total_count = await get_total_count(session, query, model, info)
 
     connection = connection_type(
         edges=edges[:limit],
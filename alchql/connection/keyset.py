@@ -0,0 +1,292 @@
+import datetime
+import decimal
+import enum
+import json
+import logging
+import uuid
+from typing import Any, List, NamedTuple, Optional, Type
+
+import sqlalchemy as sa
+from graphene import Connection, PageInfo
+from graphene.types import ResolveInfo
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import DeclarativeMeta
+from sqlalchemy.sql import ColumnElement, operators, Select
+from sqlalchemy.sql.elements import Label, UnaryExpression
+
+from . import from_query
+from .count import CountStrategy, get_total_count
+from .streaming import result_partitions
+from .utils import base64, unbase64
+from ..model_index import get_model_info
+from ..query_helper import QueryHelper
+from ..statement_stats import name_statement
+from ..projection import get_projection
+
+PREFIX = "keyset:"
+KEY_LABEL = "_keyset_{}"
+
+
+class KeysetKey(NamedTuple):
+    column: ColumnElement
+    descending: bool
+    # NULLS LAST in the requested order, otherwise the column has no NULLs
+    nulls_last: bool
+
+
+def get_keyset_keys(query: Select, model: Type[DeclarativeMeta]) -> List[KeysetKey]:
+    """
+    Keys of the query order, e.g. from the sort enum, followed by the primary
+    key columns missing from it so every row has a unique position.
+    """
+    keys = []
+    for clause in query._order_by_clauses:
+        descending = nulls_last = False
+        while isinstance(clause, UnaryExpression):
+            if clause.modifier is operators.desc_op:
+                descending = True
+            elif clause.modifier is operators.nulls_last_op:
+                nulls_last = True
+            elif clause.modifier is not operators.asc_op:
+                raise ValueError(f"Unsupported keyset order: {clause}")
+            clause = clause.element
+
+        if isinstance(clause, Label):
+            clause = clause.element
+        keys.append(KeysetKey(clause, descending, nulls_last))
+
+    for column in get_model_info(model).primary_key:
+        if not any(column.compare(key.column) for key in keys):
+            keys.append(KeysetKey(column, False, False))
+
+    return keys
+
+
+def _to_json(value):
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def _from_json(value, column: ColumnElement):
+    if value is None:
+        return None
+
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+
+    if issubclass(python_type, enum.Enum):
+        return python_type[value]
+    if python_type in (datetime.datetime, datetime.date, datetime.time):
+        return python_type.fromisoformat(value)
+    if python_type in (decimal.Decimal, uuid.UUID):
+        return python_type(value)
+    return value
+
+
+def keyset_to_cursor(values: List[Any]) -> str:
+    """Create the cursor string from the key values of a row."""
+    return base64(PREFIX + json.dumps([_to_json(v) for v in values]))
+
+
+def cursor_to_keyset(cursor: Optional[str], keys: List[KeysetKey]) -> Optional[list]:
+    """Extract key values from the cursor string, None for a foreign cursor."""
+    if not isinstance(cursor, str):
+        return None
+
+    text = unbase64(cursor)
+    if not text.startswith(PREFIX):
+        return None
+
+    try:
+        values = json.loads(text[len(PREFIX) :])
+        if not isinstance(values, list) or len(values) != len(keys):
+            return None
+        return [_from_json(v, key.column) for v, key in zip(values, keys)]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _is_after(key: KeysetKey, value, reverse: bool):
+    descending = key.descending != reverse
+    nulls_first = key.nulls_last and reverse
+
+    if value is None:
+        return key.column.isnot(None) if nulls_first else sa.false()
+
+    after = key.column < value if descending else key.column > value
+    if key.nulls_last and not reverse:
+        after = sa.or_(after, key.column.is_(None))
+    return after
+
+
+def _is_equal(key: KeysetKey, value):
+    return key.column.is_(None) if value is None else key.column == value
+
+
+def get_seek_predicate(keys: List[KeysetKey], values: list, reverse=False):
+    """
+    Rows strictly after `values` in the order of `keys`, or strictly before
+    them when `reverse` is set. Expanded to OR-ed prefixes so mixed sort
+    directions and NULLS LAST keys are supported.
+    """
+    clauses = []
+    for position, key in enumerate(keys):
+        clauses.append(
+            sa.and_(
+                *(_is_equal(k, v) for k, v in zip(keys[:position], values)),
+                _is_after(key, values[position], reverse),
+            )
+        )
+
+    return sa.or_(*clauses)
+
+
+def get_keyset_order(keys: List[KeysetKey], reverse=False) -> list:
+    order = []
+    for key in keys:
+        clause = key.column.asc() if key.descending == reverse else key.column.desc()
+        if key.nulls_last:
+            clause = clause.nullsfirst() if reverse else clause.nullslast()
+        order.append(clause)
+
+    return order
+
+
+def construct_keyset_page_info(
+    cls: Type[PageInfo],
+    info: ResolveInfo,
+    edges: list,
+    has_previous_page: bool,
+    has_next_page: bool,
+) -> PageInfo:
+    page_info_kwargs = {}
+
+    page_info_fields = QueryHelper.get_page_info_fields(info)
+
+    if not page_info_fields:
+        return cls()
+
+    for field in page_info_fields:
+        if field == "has_previous_page":
+            page_info_kwargs[field] = has_previous_page
+        elif field == "has_next_page":
+            page_info_kwargs[field] = has_next_page
+        elif edges:
+            if field == "start_cursor":
+                page_info_kwargs[field] = edges[0].cursor
+            elif field == "end_cursor":
+                page_info_kwargs[field] = edges[-1].cursor
+
+    return cls(**page_info_kwargs)
+
+
+async def keyset_connection_from_query(
+    query: Select,
+    model: Type[DeclarativeMeta],
+    info: ResolveInfo,
+    args: Optional[dict] = None,
+    connection_type: Type[Connection] = Connection,
+    count_strategy: Optional[CountStrategy] = None,
+    yield_per: Optional[int] = None,
+) -> Connection:
+    """
+    Same as `connection_from_query`, with cursors holding the order key values
+    of the row instead of its offset. `after` and `before` become predicates
+    on the key columns, so any page costs as much as the first one.
+    """
+    args = args or {}
+    session: AsyncSession = info.context.session
+
+    edge_type = connection_type.Edge
+    node_type = edge_type.node.type
+    page_info_type = getattr(connection_type, "PageInfo", PageInfo)
+
+    first = args.get("first")
+    last = args.get("last")
+
+    if first is None and last is None:
+        first = from_query.DEFAULT_LIMIT
+        logging.warning(f"Query without border, {first=}")
+
+    current_field = QueryHelper.get_current_field(info)
+    has_total_count = current_field and "total_count" in {
+        i.name for i in current_field.values
+    }
+
+    total_count = None
+    if has_total_count:
+        total_count = await get_total_count(session, query, model, info, count_strategy)
+
+    keys = get_keyset_keys(query, model)
+    after = cursor_to_keyset(args.get("after"), keys)
+    before = cursor_to_keyset(args.get("before"), keys)
+
+    # `last` without `first` reads the page backwards from `before`
+    reverse = last is not None and first is None
+    limit = last if reverse else first
+
+    _slice = query.add_columns(
+        *(key.column.label(KEY_LABEL.format(i)) for i, key in enumerate(keys))
+    )
+    if after is not None:
+        _slice = _slice.where(get_seek_predicate(keys, after))
+    if before is not None:
+        _slice = _slice.where(get_seek_predicate(keys, before, reverse=True))
+
+    _slice = _slice.order_by(None).order_by(*get_keyset_order(keys, reverse))
+    if limit is not None:
+        _slice = _slice.limit(limit + 1)
+    _slice = name_statement(_slice, "connection", info)
+
+    key_labels = tuple(KEY_LABEL.format(i) for i in range(len(keys)))
+    edges = []
+    async with result_partitions(session, _slice, yield_per) as (columns, partitions):
+        key_indexes = [columns.index(label) for label in key_labels]
+        projection = get_projection(columns, node_type, exclude=key_labels)
+
+        async for rows in partitions:
+            edges.extend(
+                edge_type(
+                    node=projection(row),
+                    cursor=keyset_to_cursor([row[index] for index in key_indexes]),
+                )
+                for row in rows
+            )
+
+    has_more = limit is not None and len(edges) > limit
+    edges = edges[:limit]
+    if reverse:
+        edges.reverse()
+
+    has_before = False
+    if not reverse and last is not None and len(edges) > last:
+        has_before = True
+        edges = edges[-last:]
+
+    if reverse:
+        has_previous_page, has_next_page = has_more, before is not None
+    else:
+        has_previous_page, has_next_page = after is not None or has_before, has_more
+
+    connection = connection_type(
+        edges=edges,
+        page_info=construct_keyset_page_info(
+            cls=page_info_type,
+            info=info,
+            edges=edges,
+            has_previous_page=has_previous_page,
+            has_next_page=has_next_page,
+        ),
+    )
+
+    if has_total_count:
+        connection.total_count = total_count
+
+    return connection
@@ -0,0 +1,32 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Sequence
+
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+
+async def _one_partition(rows: Sequence[Row]) -> AsyncIterator[Sequence[Row]]:
+    yield rows
+
+
+@asynccontextmanager
+async def result_partitions(
+    session: AsyncSession, statement: Select, yield_per: Optional[int] = None
+):
+    """
+    Keys of the result of `statement` and an async iterator over its rows.
+    With `yield_per` rows are fetched from a server side cursor in chunks
+    of that size, so the raw rows of one chunk are kept at a time instead
+    of the whole page, otherwise all rows come as one chunk.
+    """
+    if not yield_per:
+        result = await session.execute(statement)
+        yield tuple(result.keys()), _one_partition(result.all())
+        return
+
+    result = await session.stream(statement)
+    try:
+        yield tuple(result.keys()), result.partitions(yield_per)
+    finally:
+        await result.close()
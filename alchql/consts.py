@@ -11,6 +11,12 @@ OP_CONTAINS = "contains"
 OP_LT = "lt"
 OP_GT = "gt"
 
+# loader strategies of paginated relationship connections
+LOADER_WINDOW = "window"
+LOADER_LATERAL = "lateral"
+# key of the relationship `info` choosing the loader strategy
+LOADER_STRATEGY_INFO = "alchql_loader"
+
 OPERATORS_MAPPING: Dict[str, Tuple[str, Callable]] = {
     OP_LTE: ("__le__", lambda v: v),
     OP_EQ: ("__eq__", lambda v: v),
@@ -117,6 +117,9 @@ def _convert_o2o_or_m2o_relationship(
         relationship_prop.mapper.entity
     )
 
+    # single objects are not paginated
+    field_kwargs.pop("loader_strategy", None)
+
     resolver = get_custom_resolver(obj_type, orm_field_name)
     if resolver is None:
         resolver = get_batch_resolver(relationship_prop, single=True)
@@ -140,6 +143,7 @@ def _convert_o2m_or_m2m_relationship(
     )
 
     if not child_type._meta.connection:
+        field_kwargs.pop("loader_strategy", None)
         return Field(List(child_type), **field_kwargs)
 
     # TODO Allow override of connection_field_factory and resolver via ORMField
@@ -0,0 +1,99 @@
+import asyncio
+import datetime
+import decimal
+import enum
+import json
+import uuid
+from typing import Any, Callable, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSONEncoder = Callable[[Any], bytes]
+
+# list items encoded by one encoder call before the loop runs other tasks
+ENCODE_CHUNK_SIZE = 1000
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, decimal.Decimal)):
+        return str(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def stdlib_json_encoder(content: Any) -> bytes:
+    """`json.dumps` with the options of starlette's JSONResponse."""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+def orjson_encoder(content: Any) -> bytes:
+    """
+    orjson with native datetime, UUID and enum support, integers out of its
+    64 bit range fall back to the standard library.
+    """
+    try:
+        return orjson.dumps(content, default=_default)
+    except orjson.JSONEncodeError:
+        return stdlib_json_encoder(content)
+
+
+default_json_encoder: JSONEncoder = (
+    orjson_encoder if orjson is not None else stdlib_json_encoder
+)
+
+
+def _iter_parts(
+    content: Any, encoder: JSONEncoder, chunk_size: int
+) -> Iterator[Optional[bytes]]:
+    # None marks the places the loop may run other tasks
+    if isinstance(content, dict):
+        yield b"{"
+        for i, (key, value) in enumerate(content.items()):
+            key = encoder(key if isinstance(key, str) else str(key))
+            yield (b",%s:" if i else b"%s:") % key
+            yield from _iter_parts(value, encoder, chunk_size)
+        yield b"}"
+    elif isinstance(content, list) and len(content) > chunk_size:
+        yield b"["
+        for start in range(0, len(content), chunk_size):
+            encoded = encoder(content[start : start + chunk_size])
+            yield (b",%s" if start else b"%s") % encoded[1:-1]
+            yield None
+        yield b"]"
+    else:
+        yield encoder(content)
+
+
+async def encode_json(
+    content: Any,
+    encoder: JSONEncoder = default_json_encoder,
+    chunk_size: Optional[int] = ENCODE_CHUNK_SIZE,
+) -> bytes:
+    """
+    Encodes a response without blocking the loop for the whole of it:
+    lists longer than `chunk_size` are encoded in slices, other tasks run
+    between them. Without `chunk_size` it is a single encoder call.
+    """
+    if not chunk_size:
+        return encoder(content)
+
+    parts = []
+    for part in _iter_parts(content, encoder, chunk_size):
+        if part is None:
+            await asyncio.sleep(0)
+        else:
+            parts.append(part)
+    return b"".join(parts)
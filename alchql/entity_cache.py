@@ -0,0 +1,139 @@
+import time
+from collections import defaultdict
+from typing import (
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import sqlalchemy as sa
+from graphene import ResolveInfo
+
+from .cache import CacheInfo, LRUCache
+
+ENTITY_CACHE_CONTEXT = "entity_cache"
+# tables written by the request, its loaders read them from the database
+WRITTEN_TABLES_CONTEXT = "entity_cache_written"
+
+
+class EntityCachePolicy(NamedTuple):
+    """
+    Opt-in caching of the rows loaders read for a type, declared as
+    `entity_cache` in the Meta of a SQLAlchemyObjectType.
+    """
+
+    ttl: float = 60
+    # entries kept for the table of the type
+    maxsize: int = 1024
+
+
+class EntityCacheKey(NamedTuple):
+    table: str
+    # the batch key column of the loader and its value
+    column: str
+    value: Hashable
+    # selected columns, the cached rows are tuples in this order
+    columns: Tuple[str, ...]
+
+
+class EntityCacheBackend:
+    """
+    Storage shared by requests. Entries hold the rows of one batch key and
+    are dropped when any of the tables they were read from is written.
+    """
+
+    async def get_many(self, keys: List[EntityCacheKey]) -> List[Optional[list]]:
+        raise NotImplementedError
+
+    async def set_many(
+        self,
+        items: Dict[EntityCacheKey, list],
+        policy: EntityCachePolicy,
+        tables: FrozenSet[str],
+    ):
+        raise NotImplementedError
+
+    async def invalidate(self, table: str):
+        raise NotImplementedError
+
+
+class InProcessEntityCache(EntityCacheBackend):
+    """
+    Default backend, one LRU cache per table sized by the policy of its type.
+    Every process keeps its own entries, so writes made by other processes
+    are only seen after `ttl`.
+    """
+
+    def __init__(self):
+        self._caches: Dict[str, LRUCache] = {}
+        # table -> tables whose entries were read from it
+        self._dependents: Dict[str, Set[str]] = defaultdict(set)
+
+    async def get_many(self, keys: List[EntityCacheKey]) -> List[Optional[list]]:
+        now = time.monotonic()
+        values = []
+        for key in keys:
+            cache = self._caches.get(key.table)
+            entry = cache.get(key) if cache is not None else None
+            if entry is not None and entry[0] <= now:
+                cache.pop(key)
+                entry = None
+            values.append(entry[1] if entry is not None else None)
+        return values
+
+    async def set_many(self, items, policy, tables):
+        expires = time.monotonic() + policy.ttl
+        for key, rows in items.items():
+            cache = self._caches.get(key.table)
+            if cache is None:
+                cache = self._caches[key.table] = LRUCache(maxsize=policy.maxsize)
+            cache.set(key, (expires, rows))
+
+            for table in tables:
+                self._dependents[table].add(key.table)
+
+    async def invalidate(self, table: str):
+        for name in {table, *self._dependents.pop(table, ())}:
+            cache = self._caches.get(name)
+            if cache is not None:
+                cache.clear()
+
+    def info(self) -> Dict[str, CacheInfo]:
+        return {table: cache.info() for table, cache in self._caches.items()}
+
+    def clear(self):
+        self._caches.clear()
+        self._dependents.clear()
+
+
+default_entity_cache = InProcessEntityCache()
+
+
+def get_entity_cache(info: ResolveInfo) -> EntityCacheBackend:
+    return getattr(info.context, ENTITY_CACHE_CONTEXT, None) or default_entity_cache
+
+
+def get_written_tables(info: ResolveInfo) -> Set[str]:
+    written = getattr(info.context, WRITTEN_TABLES_CONTEXT, None)
+    if written is None:
+        written = set()
+        setattr(info.context, WRITTEN_TABLES_CONTEXT, written)
+    return written
+
+
+async def invalidate_entity_cache(info: ResolveInfo, tables: Iterable[sa.Table]):
+    """
+    Drops cached rows of the written tables, loaders of the same request
+    keep reading them from the database, the transaction may roll back.
+    """
+    backend = get_entity_cache(info)
+    written = get_written_tables(info)
+    for table in tables:
+        written.add(table.fullname)
+        await backend.invalidate(table.fullname)
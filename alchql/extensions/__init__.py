@@ -1,3 +1,4 @@
 from .tracing.InlineTraceExtension import InlineTraceExtension
 from .extension import Extension
 from .extension_manager import ExtensionManager
+from .total_count import TotalCountExtension
@@ -0,0 +1,21 @@
+from graphene import Context
+
+from .extension import Extension
+from ..connection.count import TOTAL_COUNTS_CONTEXT
+
+
+class TotalCountExtension(Extension):
+    """
+    Tells clients how each `totalCount` of the response was computed,
+    e.g. `{"totalCount": {"editors": {"value": 1000, "exact": false,
+    "strategy": "capped"}}}` for a capped count shown as "1000+".
+    """
+
+    def format(self, context: Context):
+        counts = getattr(context, TOTAL_COUNTS_CONTEXT, None)
+        if counts:
+            return {
+                "totalCount": {
+                    path: result._asdict() for path, result in counts.items()
+                }
+            }
@@ -1,7 +1,7 @@
 import enum
 from functools import partial
 from inspect import isawaitable
-from typing import Type
+from typing import Optional, Type
 
 import graphene
 import sqlalchemy as sa
@@ -13,9 +13,13 @@ from sqlalchemy.orm import DeclarativeMeta, InstrumentedAttribute, RelationshipP
 from sqlalchemy.sql.elements import Label
 
 from .batching import get_batch_resolver, get_fk_resolver_reverse
+from .connection.count import CountStrategy
 from .connection.from_array_slice import connection_from_array_slice
 from .connection.from_query import connection_from_query
-from .consts import OP_EQ, OP_IN, OPERATORS_MAPPING
+from .connection.keyset import keyset_connection_from_query
+from .consts import LOADER_STRATEGY_INFO, OP_EQ, OP_IN, OPERATORS_MAPPING
+from .key_sets import KeySetFilter
+from .model_index import get_model_info
 from .query_helper import QueryHelper
 from .registry import Registry
 from .sqlalchemy_converter import convert_sqlalchemy_type
@@ -23,6 +27,26 @@ from .utils import EnumValue, FilterItem, get_query, GlobalFilters
 
 
 class UnsortedSQLAlchemyConnectionField(ConnectionField):
+    def __init__(
+        self,
+        type_,
+        *args,
+        keyset: bool = False,
+        window_count: bool = False,
+        count_strategy: CountStrategy = None,
+        yield_per: Optional[int] = None,
+        **kwargs,
+    ):
+        # cursors hold the order key values instead of offsets
+        self.keyset = keyset
+        # totalCount from `count(*) OVER ()` of the page query
+        self.window_count = window_count
+        # exact count by default, see `alchql.connection.count`
+        self.count_strategy = count_strategy
+        # rows streamed and converted in chunks of this size
+        self.yield_per = yield_per
+        super().__init__(type_, *args, **kwargs)
+
     @property
     def type(self):
         from .types import SQLAlchemyObjectType
@@ -72,6 +96,10 @@ class UnsortedSQLAlchemyConnectionField(ConnectionField):
         info: ResolveInfo,
         args,
         resolved,
+        keyset: bool = False,
+        window_count: bool = False,
+        count_strategy: CountStrategy = None,
+        yield_per: Optional[int] = None,
     ):
         if resolved is None:
             edge_type = connection_type.Edge
@@ -85,25 +113,45 @@ class UnsortedSQLAlchemyConnectionField(ConnectionField):
                 **args,
             )
 
-            connection = await connection_from_query(
-                query,
-                info=info,
-                model=model,
-                args=args,
-                connection_type=connection_type,
-            )
+            if keyset:
+                connection = await keyset_connection_from_query(
+                    query,
+                    info=info,
+                    model=model,
+                    args=args,
+                    connection_type=connection_type,
+                    count_strategy=count_strategy,
+                    yield_per=yield_per,
+                )
+            else:
+                connection = await connection_from_query(
+                    query,
+                    info=info,
+                    model=model,
+                    args=args,
+                    connection_type=connection_type,
+                    window_count=window_count,
+                    count_strategy=count_strategy,
+                    yield_per=yield_per,
+                )
         else:
             if isawaitable(resolved):
                 resolved = await resolved
 
+            # loaders paginating in SQL return the page with its position
             connection = connection_from_array_slice(
                 array_slice=resolved,
                 args=args,
+                slice_start=getattr(resolved, "slice_start", 0),
+                array_length=getattr(resolved, "array_length", None),
                 connection_type=connection_type,
             )
 
             if hasattr(connection, "total_count"):
-                connection.total_count = len(resolved)
+                total_count = getattr(resolved, "total_count", None)
+                connection.total_count = (
+                    len(resolved) if total_count is None else total_count
+                )
         return connection
 
     @classmethod
@@ -114,6 +162,10 @@ class UnsortedSQLAlchemyConnectionField(ConnectionField):
         model: Type[DeclarativeMeta],
         root,
         info: ResolveInfo,
+        keyset: bool = False,
+        window_count: bool = False,
+        count_strategy: CountStrategy = None,
+        yield_per: Optional[int] = None,
         **args,
     ):
         types = getattr(info.context, "object_types", {})
@@ -121,7 +173,17 @@ class UnsortedSQLAlchemyConnectionField(ConnectionField):
         setattr(info.context, "object_types", types)
         resolved = resolver(root, info, **args)
 
-        on_resolve = partial(cls.resolve_connection, connection_type, model, info, args)
+        on_resolve = partial(
+            cls.resolve_connection,
+            connection_type,
+            model,
+            info,
+            args,
+            keyset=keyset,
+            window_count=window_count,
+            count_strategy=count_strategy,
+            yield_per=yield_per,
+        )
         result = on_resolve(resolved)
 
         if isawaitable(result):
@@ -134,6 +196,10 @@ class UnsortedSQLAlchemyConnectionField(ConnectionField):
             parent_resolver,
             get_nullable_type(self.type),
             self.model,
+            keyset=self.keyset,
+            window_count=self.window_count,
+            count_strategy=self.count_strategy,
+            yield_per=self.yield_per,
         )
 
 
@@ -208,10 +274,7 @@ class FilterConnectionField(SQLAlchemyConnectionField):
             type_=graphene.List(of_type=graphene.ID)
         )
         filters[GlobalFilters.ID__IN] = FilterItem(
-            filter_func=getattr(
-                sa.inspect(type_._meta.model).primary_key[0],
-                OPERATORS_MAPPING[OP_IN][0],
-            ),
+            filter_func=KeySetFilter(sa.inspect(type_._meta.model).primary_key[0]),
             field_type=graphene.List(of_type=graphene.ID),
         )
 
@@ -246,7 +309,11 @@ class FilterConnectionField(SQLAlchemyConnectionField):
                 kwargs[filter_name] = graphene.Argument(type_=operator_field_type)
                 filters[filter_name] = FilterItem(
                     field_type=operator_field_type,
-                    filter_func=getattr(field, OPERATORS_MAPPING[operator][0]),
+                    filter_func=(
+                        KeySetFilter(field)
+                        if operator == OP_IN
+                        else getattr(field, OPERATORS_MAPPING[operator][0])
+                    ),
                     value_func=OPERATORS_MAPPING[operator][1],
                 )
 
@@ -329,7 +396,9 @@ class FilterConnectionField(SQLAlchemyConnectionField):
 
         if object_type and hasattr(object_type, "set_select_from"):
             gql_field = QueryHelper.get_current_field(info)
-            query = await object_type.set_select_from(info, query, gql_field.values)
+            query = await object_type.set_select_from(
+                info, query, QueryHelper.copy_fields(gql_field.values)
+            )
 
         if filters:
             query = query.where(sa.and_(*filters))
@@ -346,7 +415,7 @@ class FilterConnectionField(SQLAlchemyConnectionField):
                 else:
                     sort_args.append(item)
 
-            sort_args.extend(sa.inspect(model).primary_key)
+            sort_args.extend(get_model_info(model).primary_key)
 
             query = query.order_by(*sort_args)
 
@@ -401,10 +470,14 @@ class BatchSQLAlchemyConnectionField(FilterConnectionField, ModelField):
         )
 
     @classmethod
-    def from_relationship(cls, relationship, registry, **field_kwargs):
+    def from_relationship(
+        cls, relationship, registry, loader_strategy=None, **field_kwargs
+    ):
         model = relationship.mapper.entity
         model_type = registry.get_type_for_model(model)
-        resolver = get_batch_resolver(relationship)
+        if loader_strategy is None:
+            loader_strategy = relationship.info.get(LOADER_STRATEGY_INFO)
+        resolver = get_batch_resolver(relationship, loader_strategy=loader_strategy)
 
         if hasattr(model_type._meta, "filter_fields"):
             BatchSQLAlchemyConnectionField.set_filter_fields(model_type, field_kwargs)
@@ -415,13 +488,17 @@ class BatchSQLAlchemyConnectionField(FilterConnectionField, ModelField):
         return cls(model_type, resolver=resolver, **field_kwargs)
 
     @classmethod
-    def from_fk(cls, fk: ForeignKey, registry, **field_kwargs):
+    def from_fk(cls, fk: ForeignKey, registry, loader_strategy=None, **field_kwargs):
         model_type = registry.get_type_for_model(fk.constraint.table)
 
         if not model_type:
             return
 
-        resolver = get_fk_resolver_reverse(fk, single=False)
+        if loader_strategy is None:
+            loader_strategy = fk.info.get(LOADER_STRATEGY_INFO)
+        resolver = get_fk_resolver_reverse(
+            fk, single=False, loader_strategy=loader_strategy
+        )
 
         if hasattr(model_type._meta, "filter_fields"):
             BatchSQLAlchemyConnectionField.set_filter_fields(model_type, field_kwargs)
@@ -21,23 +21,14 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
-import re
-from typing import Union
+from typing import List, Union
 
-import sqlalchemy
 from graphene import Dynamic, ResolveInfo
 from graphql import FieldNode, FragmentDefinitionNode
 
+from .model_index import get_model_info
 from .registry import get_global_registry, Registry
-
-_camel_to_snake_re = re.compile(
-    r"((?!^[^A-Z]*)|\b[a-zA-Z][a-z\d]*)([A-Z]\d*[a-z]*|\d+)"
-)
-
-
-def camel_to_snake(name: str) -> str:
-    name = _camel_to_snake_re.sub(r"\1_\2", name)
-    return name.lower()
+from .selection import camel_to_snake, get_selection_plan, QueryField
 
 
 def collect_fields(node, fragments, cls_name: str = None):
@@ -114,30 +105,43 @@ def get_tree(info: ResolveInfo, cls_name: str = None):
     return collect_fields(node, fragments, cls_name)
 
 
-def get_fields(model, info: ResolveInfo, cls_name=None, registry: Registry = None):
-    tree = get_tree(info, cls_name)
+def get_node_fields(info: ResolveInfo, cls_name: str = None) -> List[QueryField]:
+    """Selection of the current field, of its nodes for a connection
 
-    if "edges" in tree:
-        tree = tree["edges"]
-        if "node" in tree:
-            tree = tree["node"]
+    Uses the cached selection plan of the current field, so the selection
+    is not converted to dicts on every call. Names are snake_case.
+    """
+    plan = get_selection_plan(info, cls_name, collapse=False)
+    fields = plan.fields[0].values or [] if plan.fields else []
 
+    for name in ("edges", "node"):
+        for field in fields:
+            if field.name == name:
+                fields = field.values or []
+                break
+        else:
+            break
+
+    return fields
+
+
+def get_fields(model, info: ResolveInfo, cls_name=None, registry: Registry = None):
     fields = []
-    for key in tree.keys():
+    for key in sorted({field.name for field in get_node_fields(info, cls_name)}):
         if key == "__typename":
             continue
 
-        model_names = {key, camel_to_snake(key)}
-        for model_name in model_names:
-            if hasattr(model, model_name):
-                ex = getattr(model, model_name).expression
-                break
+        if hasattr(model, key):
+            ex = getattr(model, key).expression
         else:
             registry = registry or get_global_registry()
             type_ = registry.get_type_for_model(model, cls_name)
 
             for k, v in type_._meta.fields.items():
-                if getattr(v, "name", None) in model_names or k in model_names:
+                name = getattr(v, "name", None)
+                if key in {k, camel_to_snake(k)} or (
+                    name and camel_to_snake(name) == key
+                ):
                     if isinstance(v, Dynamic):
                         field = v.get_type()
                     else:
@@ -158,8 +162,8 @@ def get_fields(model, info: ResolveInfo, cls_name=None, registry: Registry = Non
         else:
             fields.append(ex)
 
-    for pk in sqlalchemy.inspect(model).primary_key:
+    for pk in get_model_info(model).primary_key:
         fields.append(pk)
-    fields = list(set(fields))
+    fields = list(dict.fromkeys(fields))
 
     return fields
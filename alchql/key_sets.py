@@ -0,0 +1,69 @@
+import json
+from typing import Iterable, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Dialect
+from sqlalchemy.sql import ColumnElement
+
+# IN lists are padded up to these sizes, a few statements cover all batch sizes
+IN_BUCKETS = (8, 32, 128, 512)
+# larger key sets are sent as one value instead of a parameter per key
+KEY_SET_THRESHOLD = IN_BUCKETS[-1]
+
+
+def pad_keys(keys: list) -> list:
+    """Repeats the last key up to the next bucket size, IN ignores duplicates."""
+    for size in IN_BUCKETS:
+        if len(keys) <= size:
+            return keys + [keys[-1]] * (size - len(keys))
+    return keys
+
+
+def key_set_clause(
+    column: ColumnElement, keys: Iterable, dialect: Optional[Dialect] = None
+) -> ColumnElement:
+    """
+    `column IN (keys)` in the form that suits the dialect:
+
+    - PostgreSQL: `= ANY(:keys)` with a single array parameter
+    - up to KEY_SET_THRESHOLD keys: IN padded to a bucket size
+    - more keys on SQLite: `IN (SELECT value FROM json_each(:keys))`
+    - more keys elsewhere: `IN (SELECT key FROM (VALUES ...))` with literals
+    """
+    keys = list(keys)
+    if not keys:
+        return column.in_(keys)
+
+    name = dialect.name if dialect is not None else None
+    if name == "postgresql":
+        return column == sa.any_(sa.bindparam(None, keys, type_=ARRAY(column.type)))
+
+    if len(keys) <= KEY_SET_THRESHOLD or not _all_literals(keys):
+        return column.in_(pad_keys(keys))
+
+    if name == "sqlite":
+        values = sa.func.json_each(sa.bindparam(None, json.dumps(keys)))
+        return column.in_(sa.select(values.table_valued("value").c.value))
+
+    values = sa.values(
+        sa.column("key", column.type), name="keys", literal_binds=True
+    ).data([(key,) for key in keys])
+    return column.in_(sa.select(values.c.key))
+
+
+def _all_literals(keys: list) -> bool:
+    return all(type(key) in (int, str) for key in keys)
+
+
+class KeySetFilter:
+    """
+    `filter_func` of IN filters, `QueryHelper.get_filters` passes the
+    dialect of the session to build the clause with `key_set_clause`.
+    """
+
+    def __init__(self, column: ColumnElement):
+        self.column = column
+
+    def __call__(self, keys, dialect: Optional[Dialect] = None) -> ColumnElement:
+        return key_set_clause(self.column, keys, dialect)
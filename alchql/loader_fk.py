@@ -1,16 +1,82 @@
+import asyncio
 import enum
 from collections import defaultdict
+from typing import FrozenSet, NamedTuple, Optional, Tuple
 
 import sqlalchemy as sa
 from aiodataloader import DataLoader
 from graphene import ResolveInfo
 from sqlalchemy import ForeignKey
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Dialect
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeMeta, RelationshipProperty
 from sqlalchemy.sql import Select
-
+from sqlalchemy.sql.util import find_tables
+
+from .connection.utils import cursor_to_offset
+from .consts import LOADER_LATERAL
+from .entity_cache import (
+    EntityCacheKey,
+    EntityCachePolicy,
+    get_entity_cache,
+    WRITTEN_TABLES_CONTEXT,
+)
+from .key_sets import key_set_clause
+from .model_index import get_model_index, get_model_info
+from .projection import get_projection
 from .query_helper import QueryHelper
-from .utils import EnumValue, filter_requested_fields_for_object, table_to_class
+from .statement_stats import name_statement
+from .utils import EnumValue, table_to_class
+
+
+BATCH_KEY_LABEL = "_batch_key"
+ROW_NUMBER_LABEL = "_row_number"
+PARTITION_COUNT_LABEL = "_partition_count"
+
+
+class LoadedPage(list):
+    """
+    Children of one parent paginated in SQL, `slice_start` is the offset of
+    the first one and `array_length` the number of children, if known.
+    `total_count` is set when the count is selected.
+    """
+
+    def __init__(self, items=(), slice_start=0, array_length=None):
+        super().__init__(items)
+        self.slice_start = slice_start
+        self.array_length = array_length
+        self.total_count = None
+
+
+class PageBounds(NamedTuple):
+    # offsets of the children to load, `end` is exclusive
+    start: int
+    end: Optional[int]
+    last: Optional[int]
+
+
+def get_page_bounds(args: dict) -> Optional[PageBounds]:
+    """
+    Offsets `connection_from_array_slice` would keep from all children,
+    None for a connection without `first` and `last`.
+    """
+    first = args.get("first")
+    last = args.get("last")
+    if first is None and last is None:
+        return None
+
+    after = args.get("after")
+    before = args.get("before")
+    after_offset = cursor_to_offset(after) if isinstance(after, str) else None
+    before_offset = cursor_to_offset(before) if isinstance(before, str) else None
+
+    start = after_offset + 1 if after_offset is not None else 0
+    end = before_offset
+    if first is not None:
+        end = start + first if end is None else min(end, start + first)
+
+    return PageBounds(start, end, last)
 
 
 def get_join(relation: RelationshipProperty):
@@ -70,7 +136,11 @@ class BaseLoader(DataLoader):
     ):
         self.session = session
         self.info = info
+        self.args = {}
+        # LOADER_WINDOW or LOADER_LATERAL, set by the resolver like `info`
+        self.strategy = None
         self.fields = set()
+        self.count_loader = CountLoader(self)
 
         super().__init__(*args, **kwargs)
 
@@ -102,7 +172,81 @@ class BaseLoader(DataLoader):
     def prepare_query(self, q: Select) -> Select:
         return q
 
-    async def batch_load_fn(self, keys):
+    def get_page_order(self, q: Select) -> list:
+        """Order of the query, ties broken by the primary key."""
+        order_by = list(q._order_by_clauses)
+        for column in get_model_info(self.target).primary_key:
+            if not any(column.compare(i) for i in order_by):
+                order_by.append(column)
+        return order_by
+
+    def paginate_query(self, q: Select, bounds: PageBounds) -> Select:
+        """
+        Keeps the page of every parent in SQL: rows are numbered per batch
+        key, one more row than the page tells if there is a next page.
+        `last` needs the number of children instead, counted per batch key.
+        """
+        order_by = self.get_page_order(q)
+        columns = [
+            sa.func.row_number()
+            .over(partition_by=self.target_field, order_by=order_by)
+            .label(ROW_NUMBER_LABEL)
+        ]
+        if bounds.last is not None:
+            columns.append(
+                sa.func.count()
+                .over(partition_by=self.target_field)
+                .label(PARTITION_COUNT_LABEL)
+            )
+
+        subquery = q.add_columns(*columns).order_by(None).subquery()
+        row_number = subquery.c[ROW_NUMBER_LABEL]
+
+        conditions = [row_number > bounds.start]
+        if bounds.last is not None:
+            count = subquery.c[PARTITION_COUNT_LABEL]
+            if bounds.end is not None:
+                conditions.append(row_number <= bounds.end)
+                count = sa.case((count < bounds.end, count), else_=bounds.end)
+            conditions.append(row_number > count - bounds.last)
+        elif bounds.end is not None:
+            conditions.append(row_number <= bounds.end + 1)
+
+        return sa.select(subquery).where(*conditions).order_by(row_number)
+
+    def get_page_bounds(self) -> Optional[PageBounds]:
+        return get_page_bounds(self.args)
+
+    async def load_page(self, key):
+        """
+        Children of `key`, a paginated connection selecting `totalCount`
+        gets it from `count_loader`.
+        """
+        gql_field = QueryHelper.get_current_field(self.info)
+        bounds = self.get_page_bounds()
+        if bounds is None or not any(
+            i.name == "total_count" for i in gql_field.values or ()
+        ):
+            return await self.load(key)
+
+        # `last` already counts the children of every parent
+        if bounds.last is not None:
+            page = await self.load(key)
+            page.total_count = page.array_length
+            return page
+
+        page, total_count = await asyncio.gather(
+            self.load(key), self.count_loader.load(key)
+        )
+        page.total_count = page.array_length = total_count
+        return page
+
+    async def get_query(self, keys, key_clause=None) -> Tuple[Select, type]:
+        """
+        Query of the children of `keys` with the filters, sort and hooks
+        of the current field, shared by the page and the count loaders.
+        `key_clause` replaces the key set condition, see `key_set_clause`.
+        """
         object_types = getattr(self.info.context, "object_types", {})
         object_type = object_types.get(self.info.field_name)
 
@@ -124,33 +268,246 @@ class BaseLoader(DataLoader):
         q = (
             sa.select(
                 *selected_fields,
-                self.target_field.label("_batch_key"),
+                self.target_field.label(BATCH_KEY_LABEL),
+            )
+            .where(
+                key_set_clause(self.target_field, keys, self.dialect)
+                if key_clause is None
+                else key_clause
             )
-            .where(self.target_field.in_(keys))
             .order_by(*sort_args)
         )
         q = self.prepare_query(q)
 
         if object_type and hasattr(object_type, "set_select_from"):
             setattr(self.info.context, "keys", keys)
-            q = await object_type.set_select_from(self.info, q, gql_field.values)
+            q = await object_type.set_select_from(
+                self.info, q, QueryHelper.copy_fields(gql_field.values)
+            )
             if list(q._group_by_clause):
                 q = q.group_by(self.target_field)
 
         if filters:
             q = q.where(sa.and_(*filters))
 
-        results_by_ids = defaultdict(list)
+        return q, object_type
+
+    def use_lateral(self, bounds: Optional[PageBounds]) -> bool:
+        # `last` needs the number of children, the window counts them
+        if bounds is None or bounds.last is not None:
+            return False
+        return self.strategy == LOADER_LATERAL and self.supports_lateral()
+
+    def supports_lateral(self) -> bool:
+        return self.dialect.name == "postgresql"
+
+    @property
+    def dialect(self) -> Dialect:
+        return self.session.get_bind(mapper=self.target).dialect
+
+    async def get_lateral_query(self, keys, bounds: PageBounds) -> Tuple[Select, type]:
+        """
+        `FROM unnest(:keys) JOIN LATERAL (... WHERE key = k ORDER BY ... LIMIT n)`,
+        the page of every parent can be read from an index on (key, sort)
+        instead of sorting all children.
+        """
+        keys_table = (
+            sa.func.unnest(
+                sa.bindparam("keys", list(keys), type_=ARRAY(self.target_field.type))
+            )
+            .table_valued("key")
+            .render_derived()
+        )
+
+        q, object_type = await self.get_query(
+            keys, self.target_field == keys_table.c.key
+        )
+        order_by = self.get_page_order(q)
+        q = (
+            q.add_columns(
+                sa.func.row_number().over(order_by=order_by).label(ROW_NUMBER_LABEL)
+            )
+            .order_by(None)
+            .order_by(*order_by)
+            .offset(bounds.start)
+        )
+        if bounds.end is not None:
+            q = q.limit(max(bounds.end - bounds.start, 0) + 1)
+
+        page = q.lateral()
+        q = (
+            sa.select(page)
+            .select_from(keys_table)
+            .join(page, sa.true())
+            .order_by(page.c[ROW_NUMBER_LABEL])
+        )
+        return q, object_type
+
+    async def batch_load_fn(self, keys):
+        bounds = self.get_page_bounds()
+        if self.use_lateral(bounds):
+            q, object_type = await self.get_lateral_query(keys, bounds)
+        else:
+            q, object_type = await self.get_query(keys)
+            if bounds is not None:
+                q = self.paginate_query(q, bounds)
 
         conversion_type = object_type or self.target
-        results = map(dict, await self.session.execute(q))
 
-        for result in results:
-            _batch_key = result.pop("_batch_key")
-            _data = filter_requested_fields_for_object(result, conversion_type)
-            results_by_ids[_batch_key].append(conversion_type(**_data))
+        if bounds is None:
+            policy = self.get_cache_policy(q, object_type)
+            if policy is not None:
+                columns, rows_by_ids = await self.load_cached_rows(keys, q, policy)
+            else:
+                columns, rows_by_ids = await self.load_rows(q)
+
+            projection = get_projection(
+                columns, conversion_type, exclude=(BATCH_KEY_LABEL,)
+            )
+            return [projection.all(rows_by_ids.get(key, ())) for key in keys]
+
+        q = name_statement(q, "loader", self.info)
+        result = await self.session.execute(q)
+        columns = tuple(result.keys())
+        projection = get_projection(
+            columns,
+            conversion_type,
+            exclude=(BATCH_KEY_LABEL, ROW_NUMBER_LABEL, PARTITION_COUNT_LABEL),
+        )
+        batch_key_index = columns.index(BATCH_KEY_LABEL)
+        row_number_index = columns.index(ROW_NUMBER_LABEL)
+        array_length_index = (
+            columns.index(PARTITION_COUNT_LABEL)
+            if PARTITION_COUNT_LABEL in columns
+            else None
+        )
+
+        pages = {}
+        for row in result:
+            _batch_key = row[batch_key_index]
+            page = pages.get(_batch_key)
+            if page is None:
+                page = pages[_batch_key] = LoadedPage(
+                    slice_start=row[row_number_index] - 1,
+                    array_length=(
+                        row[array_length_index]
+                        if array_length_index is not None
+                        else None
+                    ),
+                )
+
+            page.append(projection(row))
+
+        for page in pages.values():
+            if page.array_length is None:
+                # rows past the page are not loaded, one more marks the next page
+                page.array_length = page.slice_start + len(page)
+
+        return [pages.get(key, LoadedPage()) for key in keys]
+
+    async def load_rows(self, q: Select) -> Tuple[Tuple[str, ...], dict]:
+        """Result keys of `q` and its row tuples grouped by the batch key."""
+        q = name_statement(q, "loader", self.info)
+        result = await self.session.execute(q)
+        columns = tuple(result.keys())
+        batch_key_index = columns.index(BATCH_KEY_LABEL)
+
+        rows_by_ids = defaultdict(list)
+        for row in result:
+            rows_by_ids[row[batch_key_index]].append(tuple(row))
+        return columns, rows_by_ids
+
+    def get_cache_policy(self, q: Select, object_type) -> Optional[EntityCachePolicy]:
+        """
+        Policy of the loaded type, when its rows only depend on the batch key
+        and the selected columns.
+        """
+        policy = getattr(getattr(object_type, "_meta", None), "entity_cache", None)
+        if policy is None or hasattr(object_type, "set_select_from"):
+            return None
+
+        # filters and sort are not part of the cache key
+        gql_field = QueryHelper.get_current_field(self.info)
+        if gql_field is not None and any(
+            value is not None for value in (gql_field.arguments or {}).values()
+        ):
+            return None
+
+        written = getattr(self.info.context, WRITTEN_TABLES_CONTEXT, None)
+        if written and written & self.get_read_tables(q):
+            return None
+
+        return policy
+
+    @staticmethod
+    def get_read_tables(q: Select) -> FrozenSet[str]:
+        return frozenset(table.fullname for table in find_tables(q))
+
+    async def load_cached_rows(
+        self, keys, q: Select, policy: EntityCachePolicy
+    ) -> Tuple[Tuple[str, ...], dict]:
+        """
+        Rows of `keys` from the entity cache, the missing ones are loaded
+        with one query and stored for the next requests.
+        """
+        backend = get_entity_cache(self.info)
+        table = get_model_info(self.target).table.fullname
+        # cached rows are tuples read by the position of their columns
+        columns = tuple(q.selected_columns.keys())
+        cache_keys = {
+            key: EntityCacheKey(table, str(self.target_field), key, columns)
+            for key in keys
+        }
+
+        cached = await backend.get_many(list(cache_keys.values()))
+        rows_by_ids = {
+            key: rows for key, rows in zip(cache_keys, cached) if rows is not None
+        }
+        missing = [key for key in cache_keys if key not in rows_by_ids]
+        if not missing:
+            return columns, rows_by_ids
+
+        if len(missing) < len(cache_keys):
+            q, _ = await self.get_query(missing)
+        _, loaded = await self.load_rows(q)
+
+        items = {cache_keys[key]: loaded.get(key, []) for key in missing}
+        await backend.set_many(items, policy, self.get_read_tables(q))
+
+        rows_by_ids.update(loaded)
+        return columns, rows_by_ids
+
+
+class CountLoader(DataLoader):
+    """
+    Number of children per parent, counted by one grouped query per batch
+    with the filters of the page `loader`.
+    """
+
+    def __init__(self, loader: BaseLoader, *args, **kwargs):
+        self.loader = loader
+        super().__init__(*args, **kwargs)
+
+    async def batch_load_fn(self, keys):
+        loader = self.loader
+        q, _ = await loader.get_query(keys)
+
+        if list(q._group_by_clause):
+            only_q = q.order_by(None).subquery()
+        else:
+            only_q = q.with_only_columns(
+                *get_model_info(loader.target).primary_key,
+                loader.target_field.label(BATCH_KEY_LABEL),
+            ).order_by(None)
+            only_q = only_q.subquery()
+
+        count_q = sa.select(only_q.c[BATCH_KEY_LABEL], sa.func.count()).group_by(
+            only_q.c[BATCH_KEY_LABEL]
+        )
+        count_q = name_statement(count_q, "count", loader.info)
 
-        return [results_by_ids.get(key, []) for key in keys]
+        counts = dict((await loader.session.execute(count_q)).all())
+        return [counts.get(key, 0) for key in keys]
 
 
 def generate_loader_by_relationship(relation: RelationshipProperty):
@@ -162,7 +519,7 @@ def generate_loader_by_relationship(relation: RelationshipProperty):
         target_field = _target_field
 
         def prepare_query(self, q: Select) -> Select:
-            join = get_join(relation)
+            join = get_model_index().get_join(relation)
             if join is not None:
                 q = q.select_from(join)
             if relation.order_by:
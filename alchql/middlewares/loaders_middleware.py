@@ -4,23 +4,40 @@ from typing import Sequence, Type, Union
 
 import sqlalchemy as sa
 from graphene import ResolveInfo
+from graphql import OperationType
 from sqlalchemy.orm import DeclarativeMeta, Mapper
 
+from alchql.batching import LoaderRegistry, SHARED_LOADERS_CONTEXT
+from alchql.entity_cache import (
+    default_entity_cache,
+    ENTITY_CACHE_CONTEXT,
+    EntityCacheBackend,
+)
 from alchql.loader_fk import (
     generate_loader_by_foreign_key,
     generate_loader_by_relationship,
 )
+from alchql.model_index import get_model_info
 
 
 class LoaderMiddleware:
-    def __init__(self, models: Sequence[Union[Mapper, Type[DeclarativeMeta]]]):
+    def __init__(
+        self,
+        models: Sequence[Union[Mapper, Type[DeclarativeMeta]]],
+        entity_cache: EntityCacheBackend = default_entity_cache,
+    ):
+        """
+        `entity_cache` keeps rows of types with an `entity_cache` policy
+        across requests.
+        """
+        self.entity_cache = entity_cache
         self.loaders = {}
         for model in models:
             if isinstance(model, Mapper):
                 model = model.entity
 
             inspected_model = sa.inspect(model)
-            for fk in inspected_model.persist_selectable.foreign_keys:
+            for fk in get_model_info(model).foreign_keys:
                 key = (
                     fk.constraint.table,
                     fk.constraint.referred_table,
@@ -45,9 +62,25 @@ class LoaderMiddleware:
 
     async def resolve(self, next_, root, info: ResolveInfo, **args):
         if root is None:
-            session = info.context.session
+            shared = getattr(info.context, SHARED_LOADERS_CONTEXT, None)
+            if shared is not None:
+                registry = shared.registry
+            else:
+                registry = getattr(info.context, "loaders", None)
 
-            info.context.loaders = {k: v(session) for k, v in self.loaders.items()}
+            if not isinstance(registry, LoaderRegistry) or (
+                shared is None and registry.operation is not info.operation
+            ):
+                registry = LoaderRegistry(
+                    self.loaders, info.context.session, info.operation
+                )
+                if shared is not None:
+                    shared.registry = registry
+            elif info.operation.operation == OperationType.MUTATION:
+                # root fields of a mutation run one by one and may write
+                registry.clear()
+            info.context.loaders = registry
+            setattr(info.context, ENTITY_CACHE_CONTEXT, self.entity_cache)
 
         result = next_(root, info, **args)
         if isawaitable(result):
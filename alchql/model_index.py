@@ -0,0 +1,94 @@
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy import Column, ForeignKey, Table
+from sqlalchemy.orm import DeclarativeMeta, Mapper, mapperlib, RelationshipProperty
+
+
+class ModelInfo(NamedTuple):
+    model: DeclarativeMeta
+    mapper: Mapper
+    table: Table
+    primary_key: Tuple[Column, ...]
+    # foreign keys of the mapped tables and of other tables referring to them
+    foreign_keys: Tuple[ForeignKey, ...]
+    reverse_foreign_keys: Tuple[ForeignKey, ...]
+
+
+class ModelIndex:
+    """
+    Metadata of the mapped models, read by loaders, fields and mutations
+    instead of scanning mappers or inspecting models on every call.
+    Built on first use and rebuilt after a new mapper is created.
+    """
+
+    def __init__(self, mappers: Iterable[Mapper]):
+        mappers = list(mappers)
+
+        classes: Dict[Table, DeclarativeMeta] = {}
+        reverse = defaultdict(list)
+        for mapper in mappers:
+            for table in mapper.tables:
+                classes.setdefault(table, mapper.entity)
+            for fk in mapper.persist_selectable.foreign_keys:
+                try:
+                    reverse[fk.column.table].append(fk)
+                except sa.exc.NoReferencedTableError:
+                    # referred table is not defined yet
+                    continue
+
+        models = {}
+        for mapper in mappers:
+            models[mapper.entity] = ModelInfo(
+                model=mapper.entity,
+                mapper=mapper,
+                table=mapper.local_table,
+                primary_key=tuple(mapper.primary_key),
+                foreign_keys=tuple(mapper.persist_selectable.foreign_keys),
+                reverse_foreign_keys=tuple(
+                    fk for table in mapper.tables for fk in reverse.get(table, ())
+                ),
+            )
+
+        self.classes: Mapping[Table, DeclarativeMeta] = MappingProxyType(classes)
+        self.models: Mapping[DeclarativeMeta, ModelInfo] = MappingProxyType(models)
+        # relationships are only known once mappers are configured
+        self._joins: Dict[RelationshipProperty, Optional[sa.sql.Join]] = {}
+
+    def get_join(self, relationship: RelationshipProperty) -> Optional[sa.sql.Join]:
+        from .loader_fk import get_join
+
+        if relationship not in self._joins:
+            self._joins[relationship] = get_join(relationship)
+        return self._joins[relationship]
+
+
+_index: Optional[ModelIndex] = None
+
+
+def get_model_index() -> ModelIndex:
+    global _index
+    if _index is None:
+        _index = ModelIndex(
+            mapper
+            for mapper_registry in mapperlib._all_registries()
+            for mapper in mapper_registry.mappers
+        )
+    return _index
+
+
+def get_model_info(model: DeclarativeMeta) -> ModelInfo:
+    info = get_model_index().models.get(model)
+    if info is None:
+        # not mapped when the index was built, e.g. a subclass of a model
+        mapper = sa.inspect(model)
+        info = ModelIndex([mapper]).models[mapper.entity]
+    return info
+
+
+@sa.event.listens_for(Mapper, "instrument_class")
+def _reset_model_index(mapper, class_):
+    global _index
+    _index = None
@@ -0,0 +1,99 @@
+import hashlib
+from typing import Dict, Optional
+
+from .cache import CacheInfo, LRUCache
+
+PERSISTED_QUERY_VERSION = 1
+
+
+class PersistedQueryError(Exception):
+    """Error of an automatic persisted query, answered with `code`."""
+
+    def __init__(self, message: str, code: str, status_code: int = 200):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.status_code = status_code
+
+    def format(self) -> Dict:
+        return {
+            "errors": [{"message": self.message, "extensions": {"code": self.code}}]
+        }
+
+
+class PersistedQueryStore:
+    """
+    Storage of automatic persisted queries, the query text by its sha256 hash.
+    Clients send the hash alone and the text only after a miss.
+    """
+
+    async def get(self, sha256_hash: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def set(self, sha256_hash: str, query: str):
+        raise NotImplementedError
+
+
+class InProcessPersistedQueryStore(PersistedQueryStore):
+    """Default store, the last `maxsize` queries of the process."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.cache = LRUCache(maxsize=maxsize)
+
+    async def get(self, sha256_hash: str) -> Optional[str]:
+        return self.cache.get(sha256_hash)
+
+    async def set(self, sha256_hash: str, query: str):
+        self.cache.set(sha256_hash, query)
+
+    def info(self) -> CacheInfo:
+        return self.cache.info()
+
+    def clear(self):
+        self.cache.clear()
+
+
+def get_query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+async def resolve_persisted_query(
+    operation: dict, store: Optional[PersistedQueryStore]
+) -> Optional[str]:
+    """
+    Query text of `operation`. With `extensions.persistedQuery` a sent query
+    is stored under its hash, a hash alone is looked up.
+    """
+    query = operation.get("query")
+    extensions = operation.get("extensions") or {}
+    persisted = extensions.get("persistedQuery")
+    if not persisted:
+        return query
+
+    if store is None:
+        raise PersistedQueryError(
+            "PersistedQueryNotSupported", "PERSISTED_QUERY_NOT_SUPPORTED"
+        )
+    if persisted.get("version", PERSISTED_QUERY_VERSION) != PERSISTED_QUERY_VERSION:
+        raise PersistedQueryError(
+            "Unsupported persisted query version", "BAD_REQUEST", 400
+        )
+
+    sha256_hash = persisted.get("sha256Hash")
+    if not isinstance(sha256_hash, str):
+        raise PersistedQueryError("sha256Hash is missing", "BAD_REQUEST", 400)
+
+    if query is None:
+        query = await store.get(sha256_hash)
+        if query is None:
+            raise PersistedQueryError(
+                "PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND"
+            )
+        return query
+
+    if get_query_hash(query) != sha256_hash:
+        raise PersistedQueryError(
+            "provided sha does not match query", "BAD_REQUEST", 400
+        )
+    await store.set(sha256_hash, query)
+    return query
@@ -0,0 +1,122 @@
+from operator import itemgetter
+from typing import Any, Callable, Dict, Sequence, Tuple, Union
+from weakref import WeakKeyDictionary
+
+from graphene import Field, Scalar
+from graphene.types.objecttype import ObjectTypeMeta
+from sqlalchemy import Table
+
+from .records import get_ordered_record_class, get_record_class, SQLAlchemyRecord
+
+# conversion type -> (result keys, excluded keys) -> projection
+_projections_cache = WeakKeyDictionary()
+# statement shapes kept per type, the cache of a type is reset past it
+PROJECTIONS_PER_TYPE = 256
+
+
+def accepts_field(conversion_type, key: str) -> bool:
+    """Whether a result column named `key` is passed to `conversion_type`."""
+    if isinstance(conversion_type, ObjectTypeMeta):
+        if key in conversion_type._meta.fields:
+            return True
+    elif isinstance(conversion_type, Table):
+        if key in conversion_type.columns:
+            return True
+    else:
+        return True
+
+    attr = getattr(conversion_type, key, None)
+    return bool(attr) and isinstance(attr, (Field, Scalar))
+
+
+class RowProjection:
+    """
+    Builds `conversion_type` objects from result rows of one statement shape.
+    The columns the type accepts are resolved once from the result keys,
+    each row is then read by index.
+    """
+
+    __slots__ = (
+        "conversion_type",
+        "keys",
+        "names",
+        "_getter",
+        "_factory",
+        "_positional",
+    )
+
+    def __init__(
+        self,
+        keys: Tuple[str, ...],
+        conversion_type: Union[ObjectTypeMeta, Table, Any],
+        exclude: Tuple[str, ...] = (),
+    ):
+        # records of types with `slotted_records`, instances of the type otherwise
+        factory = get_record_class(conversion_type)
+        positional = isinstance(factory, type) and issubclass(factory, SQLAlchemyRecord)
+        indexes = [
+            index
+            for index, key in enumerate(keys)
+            if key not in exclude
+            and accepts_field(conversion_type, key)
+            and (not positional or key in factory._defaults)
+        ]
+        self.conversion_type = conversion_type
+        self.keys = keys
+        self.names = tuple(keys[i] for i in indexes)
+        self._getter = _tuple_getter(indexes)
+        self._positional = positional
+        if positional:
+            factory = get_ordered_record_class(factory, self.names)
+        self._factory = factory
+
+    def __call__(self, row: Sequence) -> Any:
+        if self._positional:
+            return self._factory(*self._getter(row))
+        return self._factory(**dict(zip(self.names, self._getter(row))))
+
+    def all(self, rows) -> list:
+        factory, names, getter = self._factory, self.names, self._getter
+        if self._positional:
+            return [factory(*getter(row)) for row in rows]
+        return [factory(**dict(zip(names, getter(row)))) for row in rows]
+
+    def values(self, row: Sequence) -> dict:
+        return dict(zip(self.names, self._getter(row)))
+
+
+def _tuple_getter(indexes: list) -> Callable[[Sequence], tuple]:
+    if not indexes:
+        return lambda row: ()
+    if len(indexes) == 1:
+        (index,) = indexes
+        return lambda row: (row[index],)
+    return itemgetter(*indexes)
+
+
+def get_projection(
+    keys: Sequence[str],
+    conversion_type: Union[ObjectTypeMeta, Table, Any],
+    exclude: Tuple[str, ...] = (),
+) -> RowProjection:
+    """
+    Projection of rows with `keys` to `conversion_type`, columns in `exclude`
+    are internal labels, e.g. the batch key, read by the caller.
+    """
+    keys = tuple(keys)
+    try:
+        projections: Dict[tuple, RowProjection] = _projections_cache[conversion_type]
+    except KeyError:
+        projections = _projections_cache[conversion_type] = {}
+    except TypeError:
+        # not weakly referable, compiled for this call only
+        return RowProjection(keys, conversion_type, exclude)
+
+    projection = projections.get((keys, exclude))
+    if projection is None:
+        if len(projections) >= PROJECTIONS_PER_TYPE:
+            projections.clear()
+        projection = projections[(keys, exclude)] = RowProjection(
+            keys, conversion_type, exclude
+        )
+    return projection
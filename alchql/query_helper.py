@@ -1,40 +1,31 @@
 import enum
 import logging
-import re
-from dataclasses import dataclass
-from typing import List, Optional, Set
-
-import graphene
-import sqlalchemy as sa
-from graphene import Dynamic, Field, Scalar
-from graphql import FieldNode, ListValueNode, VariableNode
+from typing import Dict, List, Optional, Set, Tuple
+
 from sqlalchemy import PrimaryKeyConstraint, Table
+from sqlalchemy.engine import Dialect
 from sqlalchemy.orm import DeclarativeMeta
 
-from .gql_fields import camel_to_snake
-from .gql_id import ResolvedGlobalId
-from .utils import EnumValue, FilterItem, filter_value_to_python
+from . import selection
+from .key_sets import KeySetFilter
+from .model_index import get_model_info
+from .selection import (
+    bind_selection_plan,
+    camel_to_snake,
+    copy_fields,
+    FragmentField,
+    QueryField,
+    RESERVED_NAMES,
+    SelectionPlan,
+)
+from .utils import EnumValue, FilterItem, get_object_type_select_map
 
-RESERVED_NAMES = ["edges", "node"]
-FRAGMENT = "fragment_spread"
-INLINE_FRAGMENT = "inline_fragment"
 ENTITY_QUERY_NAME = "_entities"
 
 
-@dataclass
-class QueryField:
-    alias: str
-    arguments: Optional[dict]
-    name: str
-    values: Optional[list]
-
-
-@dataclass
-class FragmentField:
-    name: str
-
-
 class QueryHelper:
+    plan_cache = selection.plan_cache
+
     @classmethod
     def get_filters(cls, info) -> list:
         object_types = getattr(info.context, "object_types", {})
@@ -54,39 +45,30 @@ class QueryHelper:
 
         if gql_field and gql_field.arguments:
             for name, value in gql_field.arguments.items():
-                if name not in parsed_filters:
-                    continue
-
                 if value is None:
                     continue
 
                 filter_item: FilterItem
-                filter_item = parsed_filters[name]
-                if not filter_item.filter_func:
+                filter_item = parsed_filters.get(name)
+                if filter_item is None or not filter_item.filter_func:
                     continue
 
-                if hasattr(filter_item.field_type, "parse_value"):
-                    value = filter_item.field_type.parse_value(value)
-
-                if filter_item.field_type == graphene.ID:
-                    global_id = ResolvedGlobalId.decode(value)
-                    value = global_id.id
-
-                if (
-                    filter_item.field_type == graphene.List(of_type=graphene.ID)
-                    and filter_item.field_type.of_type == graphene.ID
-                ):
-                    new_value = []
-                    for item in value:
-                        global_id = ResolvedGlobalId.decode(item)
-                        new_value.append(global_id.id)
-                    value = new_value
-
-                value = parsed_filters[name].value_func(value)
-                field_expr = parsed_filters[name].filter_func(value)
+                value = filter_item.decode(value)
+                if isinstance(filter_item.filter_func, KeySetFilter):
+                    dialect = cls.get_dialect(info, object_type)
+                    field_expr = filter_item.filter_func(value, dialect)
+                else:
+                    field_expr = filter_item.filter_func(value)
                 filters_to_apply.append(field_expr)
         return filters_to_apply
 
+    @staticmethod
+    def get_dialect(info, object_type) -> Optional[Dialect]:
+        session = getattr(info.context, "session", None)
+        if session is None:
+            return None
+        return session.get_bind(mapper=object_type._meta.model).dialect
+
     @classmethod
     def get_path_root(cls, path):
         if path.prev is None:
@@ -95,54 +77,66 @@ class QueryHelper:
 
     @classmethod
     def parse_query(cls, info) -> List[QueryField]:
-        path_root = cls.get_path_root(info.path)
-        if (
-            hasattr(info.context, "parsed_query")
-            and info.context.parsed_query.get(path_root)
-            and path_root != ENTITY_QUERY_NAME
-        ):
-            return info.context.parsed_query[path_root]
+        return cls.get_request_plan(info).fields
 
-        nodes = info.field_nodes
+    @classmethod
+    def get_request_plan(cls, info) -> SelectionPlan:
+        path_root = cls.get_path_root(info.path)
+        parsed_query = cls.get_parsed_query(info)
+        if path_root in parsed_query and path_root != ENTITY_QUERY_NAME:
+            return parsed_query[path_root]
 
-        variables = info.variable_values
         object_types = getattr(info.context, "object_types", {})
         object_type = object_types.get(info.field_name)
         object_type_name = object_type.__name__ if object_type else None
-        result = cls.__parse_nodes(nodes, variables, object_type_name)
-        fragments = cls.__parse_fragments(info.fragments, variables)
 
-        result = cls.__set_fragment_fields(result, fragments)
-        setattr(info.context, "parsed_query", {path_root: result})
+        plan = cls.get_selection_plan(info, object_type_name)
+        result = bind_selection_plan(plan, info.variable_values)
+
+        parsed_query[path_root] = result
         return result
 
     @classmethod
-    def get_selected_fields(cls, info, model, object_type, sort=None):
-        gql_field = cls.get_current_field(info)
+    def get_parsed_query(cls, info) -> Dict[str, SelectionPlan]:
+        """
+        Per-request storage of parsed root fields, keyed by the root path.
+        Filled as resolution reaches each root field of the operation.
+        """
+        parsed_query = getattr(info.context, "parsed_query", None)
+        if parsed_query is None:
+            parsed_query = {}
+            setattr(info.context, "parsed_query", parsed_query)
+
+        return parsed_query
 
-        object_type_fields = {}
+    @classmethod
+    def get_selection_plan(cls, info, object_type_name=None) -> SelectionPlan:
+        return selection.get_selection_plan(info, object_type_name, root=True)
 
-        for _name in dir(object_type):
-            if _name.startswith("_"):
-                continue
+    @classmethod
+    def set_plan_cache_size(cls, maxsize: int):
+        cls.plan_cache.resize(maxsize)
 
-            attr = getattr(object_type, _name, None)
-            if attr and isinstance(attr, (Field, Scalar)):
-                if hasattr(attr, "kwargs") and attr.kwargs.get("name"):
-                    object_type_fields[attr.kwargs.get("name")] = attr
-                else:
-                    object_type_fields[_name] = attr
+    @classmethod
+    def copy_fields(cls, fields: Optional[list]) -> Optional[list]:
+        return copy_fields(fields)
+
+    @classmethod
+    def get_selected_fields(cls, info, model, object_type, sort=None):
+        gql_field = cls.get_current_field(info)
 
-        meta_fields = object_type._meta.fields
+        select_map = get_object_type_select_map(object_type, model)
 
-        select_fields = set()
+        # ordered and deduplicated, the same selection always builds
+        # a statement with the same shape and compiled cache key
+        select_fields = {}
         if isinstance(model, Table):
             for constraint in model.constraints:
                 if isinstance(constraint, PrimaryKeyConstraint):
                     for i in constraint.columns:
-                        select_fields.add(i)
+                        select_fields[i] = None
         elif isinstance(model, DeclarativeMeta):
-            select_fields.add(sa.inspect(model).primary_key[0])
+            select_fields[get_model_info(model).primary_key[0]] = None
 
         field_names_to_process = {f.name for f in gql_field.values}
 
@@ -154,80 +148,33 @@ class QueryHelper:
                 if isinstance(item, (EnumValue, enum.Enum)):
                     field_name = "_".join(item.name.lower().split("_")[:-1])
                     sort_field_names.add(field_name)
-                else:
+                elif isinstance(item, str):
                     sort_field_names.add(item)
 
         field_names_to_process.update(sort_field_names)
-        for field in field_names_to_process:
-            current_field = object_type_fields.get(field) or meta_fields.get(field)
-
-            if current_field is None:
-                continue
-
-            if isinstance(current_field, Dynamic) and isinstance(
-                current_field.type(), Field
-            ):
-                model_field = getattr(object_type._meta.model, field, None)
-                if model_field is not None:
-                    columns = model_field.prop.local_columns
-                    relation_key = next(iter(columns))
-                    select_fields.add(relation_key)
-                else:
-                    mapped_table = (
-                        model
-                        if isinstance(model, Table)
-                        else sa.inspect(model).persist_selectable
-                    )
-
-                    for fk in mapped_table.foreign_keys:
-                        if re.sub(r"_(?:id|pk)$", "", fk.parent.key) == field:
-                            select_fields.add(fk.parent)
-                            break
-                    else:
-                        logging.warning(
-                            f"No field {field!r} in {object_type._meta.model.__name__}"
-                        )
-
-            model_field = getattr(current_field, "model_field", None)
-            if model_field is not None:
-                # labeled columns could create name conflict
-                if (
-                    getattr(current_field, "use_label", True)
-                    and field != model_field.key
-                ):
-                    select_fields.add(model_field.label(field))
-                else:
-                    select_fields.add(model_field)
+        for field in sorted(field_names_to_process):
+            columns = select_map.get(field)
+            if columns == ():
+                logging.warning(
+                    f"No field {field!r} in {object_type._meta.model.__name__}"
+                )
+            elif columns:
+                select_fields.update(dict.fromkeys(columns))
 
-        return select_fields
+        return list(select_fields)
 
     @classmethod
     def get_current_field(cls, info) -> Optional[QueryField]:
-        gql_fields = cls.parse_query(info)
-
-        def __get_prev_field(path, current_field):
-            if path.prev is None:
-                return current_field[0]
-
-            prev_field = __get_prev_field(path.prev, current_field)
-
-            if path.typename is None or path.key in ["edges", "node"]:
-                return prev_field
-            path_name = camel_to_snake(path.key)
-            if isinstance(prev_field, list):
-                fields = prev_field
-            else:
-                if prev_field.name == path_name or prev_field.alias == path_name:
-                    return prev_field
-
-                fields = prev_field.values
-            for field in fields:
-                if field.name == path_name or field.alias == path_name:
-                    return field
+        plan = cls.get_request_plan(info)
+        key = cls.__get_path_key(info.path)
 
-            return prev_field
+        route = plan.index.get(key)
+        if route is None:
+            route = cls.__find_route(plan, key)
 
-        result = __get_prev_field(info.path, gql_fields)
+        result = plan.fields[0]
+        for position in route:
+            result = result.values[position]
 
         return result
 
@@ -253,107 +200,43 @@ class QueryHelper:
 
         return set()
 
-    @classmethod
-    def __parse_nodes(cls, nodes, variables, object_type_name=None) -> list:
-        values = []
-        node: FieldNode
-        for node in nodes:
-            if node.kind == INLINE_FRAGMENT:
-                if node.type_condition.name.value == object_type_name:
-                    node_values = cls.__parse_nodes(
-                        node.selection_set.selections, variables, object_type_name
-                    )
-                    return node_values
-                continue
-
-            name = camel_to_snake(node.name.value)
-            node_values = None
-            if node.kind == FRAGMENT:
-                values.append(FragmentField(name=name))
-                continue
-
-            alias = camel_to_snake(node.alias.value) if node.alias else None
-
-            if node.selection_set:
-                node_values = cls.__parse_nodes(
-                    node.selection_set.selections, variables, object_type_name
-                )
-
-            arguments = {}
-            if node.arguments:
-                for arg in node.arguments:
-                    if isinstance(arg.value, ListValueNode):
-                        value = []
-                        for arg_value in arg.value.values:
-                            value.append(arg_value.value)
-
-                    elif isinstance(arg.value, VariableNode):
-                        value = variables.get(arg.value.name.value)
-                    else:
-                        value = arg.value.value
-
-                    arguments[camel_to_snake(arg.name.value)] = filter_value_to_python(
-                        value
-                    )
-
-            if name in RESERVED_NAMES:
-                values.extend(node_values)
-            else:
-                values.append(
-                    QueryField(
-                        alias=alias, name=name, values=node_values, arguments=arguments
-                    )
-                )
-
-        return values
+    @staticmethod
+    def __get_path_key(path) -> Tuple[str, ...]:
+        key = []
+        while path.prev is not None:
+            if path.typename is not None and path.key not in RESERVED_NAMES:
+                key.append(path.key)
+            path = path.prev
 
-    @classmethod
-    def __parse_fragments(cls, fragments: dict, variables: dict) -> dict:
-        result = {}
-        for name, fragment in fragments.items():
-            result[camel_to_snake(name)] = cls.__parse_nodes(
-                fragment.selection_set.selections, variables
-            )
-
-        return result
+        return tuple(reversed(key))
 
     @classmethod
-    def __set_fragment_fields(cls, parsed_query, fragments) -> list:
-        new_values = {}
-
-        def _proc_fragment(field_):
-            extra_fields_ = fragments.get(field_.name)
-            for extra_field_ in extra_fields_:
-                if isinstance(extra_field_, FragmentField):
-                    _proc_fragment(extra_field_)
-                    continue
-                elif extra_field_.values:
-                    extra_field_.values = cls.__set_fragment_fields(
-                        parsed_query=extra_field_.values, fragments=fragments
-                    )
-                existing_field: QueryField
-                if existing_field := new_values.get(extra_field_.name):
-                    if existing_field.values is None and extra_field_.values is None:
-                        continue
-                    existing_field.values.extend(extra_field_.values)
-                else:
-                    new_values[extra_field_.name] = extra_field_
-
-        fragment_fields = []
-        for field in parsed_query:
-            if isinstance(field, FragmentField):
-                fragment_fields.append(field)
-            else:
-                if field.values:
-                    field.values = cls.__set_fragment_fields(
-                        parsed_query=field.values, fragments=fragments
-                    )
-
-                new_values[field.name] = field
-        for field in fragment_fields:
-            _proc_fragment(field)
-
-        return list(new_values.values())
+    def __find_route(cls, plan: SelectionPlan, key: Tuple[str, ...]) -> Tuple[int, ...]:
+        """
+        Resolves a response path to positions in the tree and stores it in the
+        plan index. A path segment matching the current field, or missing from
+        the selection, keeps the lookup on the current field.
+        """
+        if not key:
+            return ()
+
+        route = plan.index.get(key[:-1])
+        if route is None:
+            route = cls.__find_route(plan, key[:-1])
+
+        current = plan.fields[0]
+        for position in route:
+            current = current.values[position]
+
+        path_name = camel_to_snake(key[-1])
+        if current.name != path_name and current.alias != path_name:
+            for position, field_ in enumerate(current.values or ()):
+                if field_.name == path_name or field_.alias == path_name:
+                    route = (*route, position)
+                    break
+
+        plan.index[key] = route
+        return route
 
     @classmethod
     def __get_query_field_page_info_fields(cls, field) -> Set[str]:
@@ -0,0 +1,97 @@
+from dataclasses import field, make_dataclass
+from typing import Any, Callable, Dict, Tuple
+
+from graphene import Field
+
+
+class SQLAlchemyRecord:
+    """
+    Base of the records built instead of object type instances for types
+    with `slotted_records` in their Meta. A record holds the values of the
+    fields in slots, without the `__dict__` of an ObjectType instance.
+    """
+
+    __slots__ = ()
+
+    _meta = None
+    _object_type = None
+    # field -> default value
+    _defaults: Dict[str, Any] = {}
+    # projected columns -> subclass taking them positionally
+    _ordered: Dict[Tuple[str, ...], type] = {}
+
+
+def _make_init(name: str, fields: dict, order) -> Callable:
+    # a generated __init__ taking the fields in `order`, the others after them
+    dataclass = make_dataclass(
+        name,
+        [(key, "typing.Any", field(default=fields[key])) for key in order],
+        bases=(),
+    )
+    return dataclass.__init__
+
+
+def make_record_class(object_type) -> type:
+    fields = {
+        key: value.default_value if isinstance(value, Field) else None
+        for key, value in object_type._meta.fields.items()
+    }
+    init = _make_init(object_type.__name__, fields, fields)
+    return type(
+        f"{object_type.__name__}Record",
+        (SQLAlchemyRecord,),
+        {
+            "__slots__": tuple(fields),
+            "__init__": init,
+            "__repr__": _repr,
+            "__module__": object_type.__module__,
+            "_meta": object_type._meta,
+            "_object_type": object_type,
+            "_defaults": fields,
+            "_ordered": {},
+        },
+    )
+
+
+def get_ordered_record_class(record_class, names: Tuple[str, ...]) -> type:
+    """
+    Subclass of `record_class` taking `names` as positional arguments, rows
+    projected to these columns are passed without building kwargs.
+    """
+    ordered = record_class._ordered.get(names)
+    if ordered is None:
+        fields = record_class._defaults
+        order = (*names, *(key for key in fields if key not in names))
+        ordered = record_class._ordered[names] = type(
+            record_class.__name__,
+            (record_class,),
+            {
+                "__slots__": (),
+                "__init__": _make_init(record_class.__name__, fields, order),
+                "__module__": record_class.__module__,
+            },
+        )
+    return ordered
+
+
+def _repr(self) -> str:
+    values = ", ".join(f"{key}={getattr(self, key)!r}" for key in self._defaults)
+    return f"{self._object_type.__name__}({values})"
+
+
+def get_record_class(conversion_type):
+    """
+    Class rows are converted to: the record class of an object type with
+    `slotted_records`, otherwise `conversion_type` itself.
+    """
+    meta = getattr(conversion_type, "_meta", None)
+    if not getattr(meta, "slotted_records", False):
+        return conversion_type
+
+    # built on first use, the fields of the type are complete by then
+    record_class = conversion_type.__dict__.get("_record_class")
+    if record_class is None:
+        record_class = conversion_type._record_class = make_record_class(
+            conversion_type
+        )
+    return record_class
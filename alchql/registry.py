@@ -7,6 +7,8 @@ from sqlalchemy import Column, Table
 from sqlalchemy.orm import DeclarativeMeta
 from sqlalchemy.types import Enum as SQLAlchemyEnumType
 
+from .model_index import get_model_info
+
 if TYPE_CHECKING:
     from .types import SQLAlchemyObjectType
 
@@ -14,6 +16,8 @@ if TYPE_CHECKING:
 class Registry:
     def __init__(self):
         self._registry = defaultdict(list)
+        # (table, type name) -> type, `get_type_for_model` with `cls_name`
+        self._registry_names = {}
         self._registry_models = {}
         self._registry_orm_fields = defaultdict(dict)
         self._registry_composites = {}
@@ -30,14 +34,18 @@ class Registry:
         assert obj_type._meta.registry == self, "Registry for a Model have to match."
         table = sa.inspect(obj_type._meta.model).local_table
         self._registry[table].append(obj_type)
+        self._registry_names.setdefault((table, obj_type.__name__), obj_type)
 
     def get_type_for_model(self, model: Union[DeclarativeMeta, Table], cls_name=None):
         if isinstance(model, DeclarativeMeta):
-            model = sa.inspect(model).local_table
+            model = get_model_info(model).table
+
+        if cls_name is not None:
+            return self._registry_names.get((model, cls_name))
 
-        for i in self._registry[model]:
-            if cls_name is None or cls_name == i.__name__:
-                return i
+        types = self._registry.get(model)
+        if types:
+            return types[0]
 
     def register_orm_field(
         self,
@@ -0,0 +1,376 @@
+import hashlib
+import re
+from copy import deepcopy
+from dataclasses import dataclass, field as dataclass_field
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from graphql import FieldNode, ListValueNode, VariableNode
+from graphql.pyutils import Path
+
+from .cache import LRUCache
+
+RESERVED_NAMES = ["edges", "node"]
+FRAGMENT = "fragment_spread"
+INLINE_FRAGMENT = "inline_fragment"
+PLAN_CACHE_SIZE = 1024
+
+_camel_to_snake_re = re.compile(
+    r"((?!^[^A-Z]*)|\b[a-zA-Z][a-z\d]*)([A-Z]\d*[a-z]*|\d+)"
+)
+
+
+def camel_to_snake(name: str) -> str:
+    name = _camel_to_snake_re.sub(r"\1_\2", name)
+    return name.lower()
+
+
+def filter_value_to_python(value):
+    """
+    Turn the string `value` into a python object.
+    >>> filter_value_to_python([1, 2, 3])
+    [1, 2, 3]
+    >>> filter_value_to_python(123)
+    123
+    >>> filter_value_to_python('true')
+    True
+    >>> filter_value_to_python('False')
+    False
+    >>> filter_value_to_python('null')
+    >>> filter_value_to_python('None')
+    >>> filter_value_to_python('Ø')
+    u'O'
+    """
+    if isinstance(value, list):
+        return value
+    if isinstance(value, int):
+        return value
+
+    # Simple values
+    if value in ["true", "True", True]:
+        value = True
+    elif value in ["false", "False", False]:
+        value = False
+    elif value in ("null", "none", "None", None):
+        value = None
+
+    return value
+
+
+@dataclass
+class QueryField:
+    alias: str
+    arguments: Optional[dict]
+    name: str
+    values: Optional[list]
+
+
+@dataclass
+class FragmentField:
+    name: str
+
+
+class _Variable(NamedTuple):
+    name: str
+
+
+@dataclass
+class SelectionPlan:
+    fields: List[QueryField]
+    has_variables: bool = False
+    # normalized response path -> positions of the field in the tree
+    index: Dict[Tuple[str, ...], Tuple[int, ...]] = dataclass_field(
+        default_factory=dict
+    )
+
+
+plan_cache = LRUCache(maxsize=PLAN_CACHE_SIZE)
+
+
+def get_selection_plan(
+    info, object_type_name=None, collapse=True, root=False
+) -> SelectionPlan:
+    """
+    Returns the compiled selection of the current field, or with `root` of
+    the root field it is nested in.
+    Plans do not depend on variable values, so they are shared between
+    requests in `plan_cache`, keyed by a digest of the document, operation
+    name, field path, object type and `collapse`.
+    """
+    if not isinstance(info.path, Path):
+        raise TypeError(f"Can not compile selection of {info!r}")
+
+    path, nodes = info.path, info.field_nodes
+    if root and path.prev is not None:
+        root_path = path
+        while root_path.prev is not None:
+            # fields right below the root are named with its runtime type
+            if not isinstance(root_path.key, int):
+                object_type_name = root_path.typename
+            root_path = root_path.prev
+        root_nodes = _get_root_nodes(
+            info.operation.selection_set, info.fragments, root_path.key
+        )
+        if root_nodes:
+            path, nodes = root_path, root_nodes
+
+    key = _get_plan_key(info.operation, path, object_type_name, collapse)
+    if key is not None:
+        plan = plan_cache.get(key)
+        if plan is not None:
+            return plan
+
+    plan = compile_selection_plan(nodes, info.fragments, object_type_name, collapse)
+
+    if key is not None:
+        plan_cache.set(key, plan)
+    return plan
+
+
+def _get_root_nodes(selection_set, fragments: dict, response_key: str) -> list:
+    nodes = []
+    for node in selection_set.selections:
+        if node.kind == FRAGMENT:
+            nodes.extend(
+                _get_root_nodes(
+                    fragments[node.name.value].selection_set, fragments, response_key
+                )
+            )
+        elif node.kind == INLINE_FRAGMENT:
+            nodes.extend(_get_root_nodes(node.selection_set, fragments, response_key))
+        elif (node.alias or node.name).value == response_key:
+            nodes.append(node)
+    return nodes
+
+
+def compile_selection_plan(
+    nodes, fragments: dict, object_type_name=None, collapse=True
+) -> SelectionPlan:
+    """
+    Parses field nodes into a `QueryField` tree with fragments merged in.
+    With `collapse`, `edges` and `node` are replaced by their selections,
+    the current field itself is always kept.
+    """
+    result = _parse_nodes(nodes, object_type_name, collapse, root=True)
+    parsed_fragments = _parse_fragments(fragments, collapse)
+    result = _set_fragment_fields(result, parsed_fragments)
+
+    return SelectionPlan(
+        fields=result,
+        has_variables=_has_variables(result),
+    )
+
+
+def bind_selection_plan(
+    plan: SelectionPlan, variables: Optional[dict]
+) -> SelectionPlan:
+    if not plan.has_variables:
+        return plan
+
+    # bound tree keeps the shape of the plan, so the path index is shared
+    return SelectionPlan(
+        fields=_bind_fields(plan.fields, variables or {}),
+        index=plan.index,
+    )
+
+
+def copy_fields(fields: Optional[list]) -> Optional[list]:
+    """
+    Parsed fields may be shared with other requests through `plan_cache`,
+    user hooks receive a copy they are free to modify.
+    """
+    return deepcopy(fields)
+
+
+def get_selection_key(field: Optional[QueryField]) -> Hashable:
+    """
+    Hashable form of a parsed field with its arguments and selections,
+    aliases left out. Equal keys load the same rows.
+    """
+    if field is None:
+        return None
+    return field.name, _freeze(field.arguments), _freeze(field.values)
+
+
+def _freeze(value) -> Hashable:
+    if isinstance(value, QueryField):
+        return get_selection_key(value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, FragmentField):
+        return FRAGMENT, value.name
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _get_plan_key(
+    operation, path: Path, object_type_name=None, collapse=True
+) -> Optional[tuple]:
+    if operation is None or operation.loc is None:
+        return None
+
+    path_key = []
+    current = path
+    while current is not None:
+        if not isinstance(current.key, int):
+            path_key.append((current.key, current.typename))
+        current = current.prev
+
+    operation_name = operation.name.value if operation.name else None
+    body = operation.loc.source.body
+    return (
+        hashlib.sha1(body.encode()).hexdigest(),
+        operation_name,
+        tuple(path_key),
+        object_type_name,
+        collapse,
+    )
+
+
+def _parse_nodes(nodes, object_type_name=None, collapse=True, root=False) -> list:
+    values = []
+    node: FieldNode
+    for node in nodes:
+        if node.kind == INLINE_FRAGMENT:
+            if node.type_condition.name.value == object_type_name:
+                values.extend(
+                    _parse_nodes(
+                        node.selection_set.selections, object_type_name, collapse
+                    )
+                )
+            continue
+
+        name = camel_to_snake(node.name.value)
+        node_values = None
+        if node.kind == FRAGMENT:
+            values.append(FragmentField(name=name))
+            continue
+
+        alias = camel_to_snake(node.alias.value) if node.alias else None
+
+        if node.selection_set:
+            node_values = _parse_nodes(
+                node.selection_set.selections, object_type_name, collapse
+            )
+
+        arguments = {}
+        if node.arguments:
+            for arg in node.arguments:
+                if isinstance(arg.value, VariableNode):
+                    value = _Variable(arg.value.name.value)
+                elif isinstance(arg.value, ListValueNode):
+                    value = []
+                    for arg_value in arg.value.values:
+                        value.append(arg_value.value)
+                    value = filter_value_to_python(value)
+                else:
+                    value = filter_value_to_python(arg.value.value)
+
+                arguments[camel_to_snake(arg.name.value)] = value
+
+        if collapse and not root and name in RESERVED_NAMES:
+            values.extend(node_values)
+        else:
+            values.append(
+                QueryField(
+                    alias=alias, name=name, values=node_values, arguments=arguments
+                )
+            )
+
+    return values
+
+
+def _parse_fragments(fragments: dict, collapse=True) -> dict:
+    result = {}
+    for name, fragment in fragments.items():
+        result[camel_to_snake(name)] = _parse_nodes(
+            fragment.selection_set.selections, collapse=collapse
+        )
+
+    return result
+
+
+def _has_variables(fields: Optional[list]) -> bool:
+    for field in fields or ():
+        if field.arguments and any(
+            isinstance(value, _Variable) for value in field.arguments.values()
+        ):
+            return True
+        if _has_variables(field.values):
+            return True
+
+    return False
+
+
+def _bind_fields(fields: Optional[list], variables: dict) -> Optional[list]:
+    if fields is None:
+        return None
+
+    result = []
+    for field in fields:
+        arguments = field.arguments
+        if arguments:
+            arguments = {
+                name: filter_value_to_python(variables.get(value.name))
+                if isinstance(value, _Variable)
+                else value
+                for name, value in arguments.items()
+            }
+
+        result.append(
+            QueryField(
+                alias=field.alias,
+                name=field.name,
+                values=_bind_fields(field.values, variables),
+                arguments=arguments,
+            )
+        )
+
+    return result
+
+
+def _set_fragment_fields(parsed_query, fragments) -> list:
+    new_values = {}
+
+    def _proc_fragment(field_):
+        extra_fields_ = fragments.get(field_.name)
+        for extra_field_ in extra_fields_:
+            if isinstance(extra_field_, FragmentField):
+                _proc_fragment(extra_field_)
+                continue
+            elif extra_field_.values:
+                extra_field_.values = _set_fragment_fields(
+                    parsed_query=extra_field_.values, fragments=fragments
+                )
+            existing_field: QueryField
+            if existing_field := new_values.get(_response_key(extra_field_)):
+                if existing_field.values is None and extra_field_.values is None:
+                    continue
+                existing_field.values.extend(extra_field_.values)
+            else:
+                new_values[_response_key(extra_field_)] = extra_field_
+
+    fragment_fields = []
+    for field in parsed_query:
+        if isinstance(field, FragmentField):
+            fragment_fields.append(field)
+        else:
+            if field.values:
+                field.values = _set_fragment_fields(
+                    parsed_query=field.values, fragments=fragments
+                )
+
+            new_values[_response_key(field)] = field
+    for field in fragment_fields:
+        _proc_fragment(field)
+
+    return list(new_values.values())
+
+
+def _response_key(field: QueryField) -> str:
+    # aliases of the same field are selected separately
+    return field.alias or field.name
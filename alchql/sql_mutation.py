@@ -12,9 +12,11 @@ from graphene.utils.get_unbound_function import get_unbound_function
 from graphene.utils.props import props
 from sqlalchemy.orm import DeclarativeMeta
 
+from .entity_cache import invalidate_entity_cache
 from .get_input_type import get_input_fields, get_input_type
 from .gql_fields import get_fields
 from .gql_id import ResolvedGlobalId
+from .model_index import get_model_info
 from .query_helper import QueryHelper
 from .registry import get_global_registry, Registry
 from .types import SQLAlchemyObjectType
@@ -58,11 +60,18 @@ class _BaseMutation(ObjectType):
             registry=cls._meta.registry,
         )
 
+    @classmethod
+    async def invalidate_entity_cache(cls, info: ResolveInfo):
+        """Drops cached rows of the tables of the model, see `EntityCachePolicy`."""
+        await invalidate_entity_cache(
+            info, get_model_info(cls._meta.model).mapper.tables
+        )
+
     @classmethod
     async def get_node(cls, info: ResolveInfo, id: int):
         session = info.context.session
 
-        pk = sqlalchemy.inspect(cls._meta.model).primary_key[0]
+        pk = get_model_info(cls._meta.model).primary_key[0]
         q = (await cls.get_query(info)).where(pk == id)
         result = cls(**(await session.execute(q)).first())
         return result
@@ -152,8 +161,7 @@ class SQLAlchemyUpdateMutation(_BaseMutation):
         model = cls._meta.model
         output = cls._meta.output
 
-        table = sa.inspect(model).persist_selectable
-        pk = table.primary_key.columns[0]
+        pk = get_model_info(model).primary_key[0]
 
         type_name, id_ = ResolvedGlobalId.decode(id)
 
@@ -169,9 +177,11 @@ class SQLAlchemyUpdateMutation(_BaseMutation):
 
         if field_set and getattr(session.bind, "name", "") != "sqlite":
             row = (await session.execute(q.returning(*field_set))).first()
+            await cls.invalidate_entity_cache(info)
             result = output(**row)
         else:
             await session.execute(q)
+            await cls.invalidate_entity_cache(info)
             result = output.get_node(info, id_)
 
             if isawaitable(result):
@@ -274,8 +284,9 @@ class SQLAlchemyCreateMutation(_BaseMutation):
         )
 
         if field_set and getattr(session.bind, "name", "") != "sqlite":
-            primary_key = sa.inspect(model).primary_key[0]
+            primary_key = get_model_info(model).primary_key[0]
             pk = (await session.execute(q.returning(primary_key))).scalar()
+            await cls.invalidate_entity_cache(info)
 
             read_query = (
                 sa.select(*field_set).select_from(model).where(primary_key == pk)
@@ -284,7 +295,7 @@ class SQLAlchemyCreateMutation(_BaseMutation):
             if output and hasattr(output, "set_select_from"):
                 gql_field = QueryHelper.get_current_field(info)
                 read_query = await output.set_select_from(
-                    info, read_query, gql_field.values
+                    info, read_query, QueryHelper.copy_fields(gql_field.values)
                 )
 
             row = (await session.execute(read_query)).first()
@@ -292,6 +303,7 @@ class SQLAlchemyCreateMutation(_BaseMutation):
             result = output(**row)
         else:
             id_ = (await session.execute(q)).inserted_primary_key[0]
+            await cls.invalidate_entity_cache(info)
             result = output.get_node(info, id_)
 
             if isawaitable(result):
@@ -366,8 +378,7 @@ class SQLAlchemyDeleteMutation(_BaseMutation):
         model = cls._meta.model
         output = cls._meta.output
 
-        table = sa.inspect(model).persist_selectable
-        pk = table.primary_key.columns[0]
+        pk = get_model_info(model).primary_key[0]
 
         type_name, id_ = ResolvedGlobalId.decode(id)
 
@@ -380,9 +391,11 @@ class SQLAlchemyDeleteMutation(_BaseMutation):
 
         if field_set and getattr(session.bind, "name", "") != "sqlite":
             row = (await session.execute(q.returning(*field_set))).first()
+            await cls.invalidate_entity_cache(info)
             result = output(**row)
         else:
             id_ = (await session.execute(q)).lastrowid
+            await cls.invalidate_entity_cache(info)
             result = output.get_node(info, id_)
 
             if isawaitable(result):
@@ -0,0 +1,74 @@
+from typing import Dict, NamedTuple
+
+from graphene import ResolveInfo
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.sql import Executable
+
+STATEMENT_NAME_OPTION = "alchql_statement"
+
+
+class StatementCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    # executions that skipped the compiled cache
+    uncached: int
+
+
+class StatementStats:
+    """
+    SQLAlchemy compiled cache hits and misses of the statements alchql runs,
+    counted per statement name, e.g. `loader:ReporterType.articles` or
+    `connection:Query.reporters`.
+
+    Off by default, `enable()` listens to `after_cursor_execute` of all
+    engines, or of the given one.
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, list] = {}
+
+    def enable(self, target=Engine):
+        if not event.contains(target, "after_cursor_execute", self._on_execute):
+            event.listen(target, "after_cursor_execute", self._on_execute)
+
+    def disable(self, target=Engine):
+        if event.contains(target, "after_cursor_execute", self._on_execute):
+            event.remove(target, "after_cursor_execute", self._on_execute)
+
+    def info(self) -> Dict[str, StatementCacheInfo]:
+        return {
+            name: StatementCacheInfo(*counts) for name, counts in self._counts.items()
+        }
+
+    def clear(self):
+        self._counts.clear()
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        name = context.execution_options.get(STATEMENT_NAME_OPTION)
+        if name is None:
+            return
+
+        counts = self._counts.get(name)
+        if counts is None:
+            counts = self._counts[name] = [0, 0, 0]
+
+        if context.cache_hit is CACHE_HIT:
+            counts[0] += 1
+        elif context.cache_hit is CACHE_MISS:
+            counts[1] += 1
+        else:
+            counts[2] += 1
+
+
+statement_stats = StatementStats()
+
+
+def name_statement(q: Executable, kind: str, info: ResolveInfo) -> Executable:
+    """
+    Tags the statement with the GraphQL field it is run for. Execution
+    options are not part of the cache key, so the shape stays the same.
+    """
+    name = f"{kind}:{info.parent_type.name}.{info.field_name}"
+    return q.execution_options(**{STATEMENT_NAME_OPTION: name})
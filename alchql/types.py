@@ -24,12 +24,15 @@ from .converter import (
     convert_sqlalchemy_hybrid_method,
     convert_sqlalchemy_relationship,
 )
+from .entity_cache import EntityCachePolicy
 from .enums import (
     enum_for_field,
     sort_argument_for_object_type,
     sort_enum_for_object_type,
 )
+from .model_index import get_model_info
 from .node import AsyncNode
+from .records import SQLAlchemyRecord
 from .registry import get_global_registry, Registry
 from .resolvers import get_attr_resolver, get_custom_resolver
 from .utils import get_query, is_mapped_class, is_mapped_instance
@@ -44,6 +47,7 @@ class ORMField(OrderedType):
         description: str = None,
         deprecation_reason: str = None,
         batching: bool = None,
+        loader_strategy: str = None,
         _creation_counter: int = None,
         **field_kwargs,
     ):
@@ -82,6 +86,9 @@ class ORMField(OrderedType):
             Same behavior as in graphene.Field. Defaults to None.
         :param bool batching:
             Toggle SQL batching. Defaults to None, that is `SQLAlchemyObjectType.meta.batching`.
+        :param str loader_strategy:
+            How batched relationship connections load a page of children, `LOADER_WINDOW`
+            or `LOADER_LATERAL`. Defaults to the `alchql_loader` key of the relationship `info`.
         :param int _creation_counter:
             Same behavior as in graphene.Field.
         """
@@ -94,6 +101,7 @@ class ORMField(OrderedType):
             "description": description,
             "deprecation_reason": deprecation_reason,
             "batching": batching,
+            "loader_strategy": loader_strategy,
         }
         common_kwargs = {
             kwarg: value for kwarg, value in common_kwargs.items() if value is not None
@@ -237,6 +245,8 @@ class SQLAlchemyObjectTypeOptions(ObjectTypeOptions):
     registry: Registry = None
     connection: Type[Connection] = None
     id: str = None
+    entity_cache: EntityCachePolicy = None
+    slotted_records: bool = False
 
 
 class SQLAlchemyObjectType(ObjectType):
@@ -256,6 +266,8 @@ class SQLAlchemyObjectType(ObjectType):
         interfaces=(),
         id=None,
         connection_field_factory=None,
+        entity_cache: EntityCachePolicy = None,
+        slotted_records: bool = False,
         _meta=None,
         **options,
     ):
@@ -321,6 +333,8 @@ class SQLAlchemyObjectType(ObjectType):
 
         _meta.connection = connection
         _meta.id = id or "id"
+        _meta.entity_cache = entity_cache
+        _meta.slotted_records = slotted_records
 
         if options.get("filter_fields"):
             _meta.filter_fields = options["filter_fields"]
@@ -338,6 +352,8 @@ class SQLAlchemyObjectType(ObjectType):
     def is_type_of(cls, root, info: ResolveInfo):
         if isinstance(root, cls):
             return True
+        if isinstance(root, SQLAlchemyRecord):
+            return root._object_type is cls
         if not is_mapped_instance(root):
             raise Exception(f'Received incompatible instance "{root}".')
         return isinstance(root, cls._meta.model)
@@ -355,7 +371,7 @@ class SQLAlchemyObjectType(ObjectType):
     async def get_node(cls, info: ResolveInfo, id):
         session = info.context.session
 
-        pk = sqlalchemy.inspect(cls._meta.model).primary_key[0]
+        pk = get_model_info(cls._meta.model).primary_key[0]
         q = (await cls.get_query(info)).where(pk == id)
         obj = (await session.execute(q)).fetchone()
         if obj:
@@ -365,9 +381,9 @@ class SQLAlchemyObjectType(ObjectType):
 
     async def resolve_id(self, info: ResolveInfo):
         key = "id"
-        if isinstance(self, SQLAlchemyObjectType):
+        if isinstance(self, (SQLAlchemyObjectType, SQLAlchemyRecord)):
             model = self._meta.model
-            key = model.__mapper__.primary_key[0].key
+            key = get_model_info(model).primary_key[0].key
         return getattr(self, key, None)
 
     @classmethod
@@ -1,19 +1,25 @@
 import logging
 import re
-from dataclasses import dataclass
-from typing import Any, Optional, Type, Union
+from dataclasses import dataclass, field as dataclass_field
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional, Tuple, Type, Union
+from weakref import WeakKeyDictionary
 
 import graphene
 import sqlalchemy as sa
-from graphene import Field, ResolveInfo, Scalar
+from graphene import Dynamic, Field, ResolveInfo, Scalar
 from graphene.types.objecttype import ObjectTypeMeta
 from sqlalchemy import Table
 from sqlalchemy.exc import ArgumentError
-from sqlalchemy.orm import class_mapper, DeclarativeMeta, mapperlib, object_mapper
+from sqlalchemy.orm import class_mapper, DeclarativeMeta, object_mapper
 from sqlalchemy.orm.exc import UnmappedClassError, UnmappedInstanceError
 
 from .gql_fields import get_fields
+from .gql_id import ResolvedGlobalId
+from .model_index import get_model_index
+from .projection import accepts_field
 from .registry import Registry
+from .selection import filter_value_to_python
 
 
 @dataclass
@@ -27,6 +33,48 @@ class FilterItem:
     name: Optional[str] = None
     required: bool = False
 
+    # argument value -> filter value, built once from field_type and value_func
+    decode: Callable[[Any], Any] = dataclass_field(
+        init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        self.decode = get_filter_decoder(self.field_type, self.value_func)
+
+
+def _decode_global_id(value):
+    return ResolvedGlobalId.decode(value).id
+
+
+def _decode_global_ids(value):
+    return [ResolvedGlobalId.decode(item).id for item in value]
+
+
+def get_filter_decoder(field_type, value_func=None) -> Callable[[Any], Any]:
+    """
+    Chains the conversions of a filter argument value: scalar parsing,
+    global id decoding and `value_func`. Only the conversions the field
+    type needs are kept, so request time work is a few calls.
+    """
+    steps = []
+    if hasattr(field_type, "parse_value"):
+        steps.append(field_type.parse_value)
+
+    if field_type == graphene.ID:
+        steps.append(_decode_global_id)
+    elif isinstance(field_type, graphene.List) and field_type.of_type == graphene.ID:
+        steps.append(_decode_global_ids)
+
+    if value_func is not None:
+        steps.append(value_func)
+
+    def decode(value):
+        for step in steps:
+            value = step(value)
+        return value
+
+    return decode
+
 
 @dataclass
 class GlobalFilters:
@@ -128,70 +176,26 @@ def _deprecated_object_type_for_model(cls, name):
         return ObjType
 
 
-def filter_value_to_python(value):
-    """
-    Turn the string `value` into a python object.
-    >>> filter_value_to_python([1, 2, 3])
-    [1, 2, 3]
-    >>> filter_value_to_python(123)
-    123
-    >>> filter_value_to_python('true')
-    True
-    >>> filter_value_to_python('False')
-    False
-    >>> filter_value_to_python('null')
-    >>> filter_value_to_python('None')
-    >>> filter_value_to_python('Ø')
-    u'O'
-    """
-    if isinstance(value, list):
-        return value
-    if isinstance(value, int):
-        return value
-
-    # Simple values
-    if value in ["true", "True", True]:
-        value = True
-    elif value in ["false", "False", False]:
-        value = False
-    elif value in ("null", "none", "None", None):
-        value = None
-
-    return value
-
-
 def filter_requested_fields_for_object(
     data: dict, conversion_type: Union[ObjectTypeMeta, object]
 ):
-    if isinstance(conversion_type, ObjectTypeMeta):
-        result = {}
-        fields = conversion_type._meta.fields.keys()
-        for key, value in data.items():
-            if key in fields:
-                result[key] = value
-            else:
-                attr = getattr(conversion_type, key, None)
-                if attr and isinstance(attr, (Field, Scalar)):
-                    result[key] = value
-
-        return result
-    if isinstance(conversion_type, Table):
-        result = {}
-        fields = conversion_type.columns.keys()
-        for key, value in data.items():
-            if key in fields:
-                result[key] = value
-            else:
-                attr = getattr(conversion_type, key, None)
-                if attr and isinstance(attr, (Field, Scalar)):
-                    result[key] = value
+    if not isinstance(conversion_type, (ObjectTypeMeta, Table)):
+        return data
+
+    return {
+        key: value for key, value in data.items() if accepts_field(conversion_type, key)
+    }
 
-        return result
 
-    return data
+_object_type_manual_fields_cache = WeakKeyDictionary()
 
 
-def get_object_type_manual_fields(object_type):
+def get_object_type_manual_fields(object_type) -> Mapping[str, Union[Field, Scalar]]:
+    try:
+        return _object_type_manual_fields_cache[object_type]
+    except KeyError:
+        pass
+
     object_type_fields = {}
     for _name in dir(object_type):
         if _name.startswith("_"):
@@ -204,11 +208,79 @@ def get_object_type_manual_fields(object_type):
             else:
                 object_type_fields[_name] = attr
 
+    object_type_fields = MappingProxyType(object_type_fields)
+    _object_type_manual_fields_cache[object_type] = object_type_fields
     return object_type_fields
 
 
+_object_type_select_map_cache = WeakKeyDictionary()
+
+
+def get_object_type_select_map(
+    object_type, model: Union[DeclarativeMeta, Table]
+) -> Mapping[str, Tuple[sa.sql.ColumnElement, ...]]:
+    """
+    Maps GraphQL field names of the object type to the columns, labels and
+    relationship keys that have to be selected to resolve them.
+    Relationship fields without a local key map to an empty tuple.
+    Built on first use, and rebuilt until every Dynamic field resolves.
+    """
+    select_maps = _object_type_select_map_cache.setdefault(object_type, {})
+    try:
+        return select_maps[model]
+    except KeyError:
+        pass
+
+    object_type_fields = get_object_type_manual_fields(object_type)
+    meta_fields = object_type._meta.fields
+
+    select_map = {}
+    resolved = True
+    for field in {*object_type_fields, *meta_fields}:
+        current_field = object_type_fields.get(field) or meta_fields.get(field)
+
+        select_fields = []
+        is_relationship = False
+        if isinstance(current_field, Dynamic):
+            dynamic_type = current_field.type()
+            if dynamic_type is None:
+                # type is not registered yet, keep the map out of the cache
+                resolved = False
+            is_relationship = isinstance(dynamic_type, Field)
+
+        if is_relationship:
+            model_field = getattr(object_type._meta.model, field, None)
+            if model_field is not None:
+                columns = model_field.prop.local_columns
+                select_fields.append(next(iter(columns)))
+            else:
+                mapped_table = (
+                    model
+                    if isinstance(model, Table)
+                    else sa.inspect(model).persist_selectable
+                )
+
+                for fk in mapped_table.foreign_keys:
+                    if re.sub(r"_(?:id|pk)$", "", fk.parent.key) == field:
+                        select_fields.append(fk.parent)
+                        break
+
+        model_field = getattr(current_field, "model_field", None)
+        if model_field is not None:
+            # labeled columns could create name conflict
+            if getattr(current_field, "use_label", True) and field != model_field.key:
+                select_fields.append(model_field.label(field))
+            else:
+                select_fields.append(model_field)
+
+        if select_fields or is_relationship:
+            select_map[field] = tuple(select_fields)
+
+    select_map = MappingProxyType(select_map)
+    if resolved:
+        select_maps[model] = select_map
+    return select_map
+
+
 def table_to_class(table: Table) -> DeclarativeMeta:
-    for mapper_registry in mapperlib._all_registries():
-        for mapper in mapper_registry.mappers:
-            if table in mapper.tables:
-                return mapper.entity
+    return get_model_index().classes.get(table)
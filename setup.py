@@ -32,6 +32,7 @@ tests_require = [
     "aiosqlite>=0.17.0,<0.18",
     "pytest-cov",
     "starlette_graphene3",
+    "orjson>=3.0",
 ]
 
 setup(
@@ -57,6 +58,7 @@ setup(
     install_requires=requirements,
     extras_require={
         "test": tests_require,
+        "orjson": ["orjson>=3.0"],
     },
     tests_require=tests_require,
 )
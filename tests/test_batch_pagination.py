@@ -0,0 +1,368 @@
+from unittest.mock import patch
+
+import graphene
+import pytest
+import sqlalchemy as sa
+from graphene import Context
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from alchql import loader_fk
+from alchql.connection.utils import offset_to_cursor
+from alchql.consts import LOADER_LATERAL, LOADER_STRATEGY_INFO, OP_EQ
+from alchql.fields import BatchSQLAlchemyConnectionField
+from alchql.middlewares import LoaderMiddleware
+from alchql.node import AsyncNode
+from alchql.loader_fk import BaseLoader
+from alchql.types import ORMField, SQLAlchemyObjectType
+from .models import Article, Pet, Reporter
+
+ARTICLES_FK = next(iter(Article.__table__.c.reporter_id.foreign_keys))
+
+ARTICLES = {"Reporter_1": 0, "Reporter_2": 3, "Reporter_3": 7}
+
+
+async def add_test_data(session):
+    for first_name, articles in ARTICLES.items():
+        reporter_id = (
+            await session.execute(
+                sa.insert(Reporter).values({Reporter.first_name: first_name})
+            )
+        ).lastrowid
+        if articles:
+            await session.execute(
+                sa.insert(Article).values(
+                    [
+                        {
+                            Article.headline: f"{first_name}#{num % 4}",
+                            Article.reporter_id: reporter_id,
+                        }
+                        for num in range(articles)
+                    ]
+                )
+            )
+
+
+class CountableConnectionCreator:
+    @classmethod
+    def create_type(cls, connection_name, **kwargs):
+        class CountableConnection(graphene.relay.Connection):
+            total_count = graphene.Int()
+
+            class Meta:
+                name = connection_name
+                node = kwargs["node"]
+
+        return CountableConnection
+
+
+def get_schema(loader_strategy=None):
+    class ReporterType(SQLAlchemyObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (AsyncNode,)
+            connection_field_factory = BatchSQLAlchemyConnectionField.from_relationship
+
+        pets = ORMField(loader_strategy=loader_strategy)
+
+    class PetType(SQLAlchemyObjectType):
+        class Meta:
+            model = Pet
+            interfaces = (AsyncNode,)
+
+    class ArticleType(SQLAlchemyObjectType):
+        class Meta:
+            model = Article
+            interfaces = (AsyncNode,)
+            connection_class = CountableConnectionCreator
+
+    class Query(graphene.ObjectType):
+        reporters = graphene.Field(graphene.List(ReporterType))
+
+        async def resolve_reporters(self, info):
+            session = info.context.session
+            result = await session.execute(sa.select(Reporter).order_by(Reporter.id))
+            return result.scalars().all()
+
+    return graphene.Schema(query=Query)
+
+
+async def execute(session, schema, arguments, total_count=False):
+    with patch.object(AsyncSession, "execute", wraps=session.execute) as execute_:
+        result = await schema.execute_async(
+            """
+            query {
+              reporters {
+                articles(%s) {
+                  %s
+                  edges {
+                    cursor
+                    node {
+                      headline
+                    }
+                  }
+                  pageInfo {
+                    startCursor
+                    endCursor
+                    hasPreviousPage
+                    hasNextPage
+                  }
+                }
+              }
+            }
+            """
+            % (arguments, "totalCount" if total_count else ""),
+            context_value=Context(session=session),
+            middleware=[LoaderMiddleware([Article, Reporter])],
+        )
+
+    assert not result.errors, result.errors
+    statements = [str(call.args[0]) for call in execute_.call_args_list]
+    return result.data, statements
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "arguments",
+    [
+        "first: 2",
+        "first: 2, sort: HEADLINE_DESC",
+        f'first: 2, after: "{offset_to_cursor(1)}"',
+        f'first: 10, after: "{offset_to_cursor(1)}"',
+        f'first: 3, before: "{offset_to_cursor(2)}"',
+        "last: 2",
+        "last: 2, sort: [HEADLINE_ASC, ID_DESC]",
+        f'last: 2, before: "{offset_to_cursor(5)}"',
+        f'last: 2, after: "{offset_to_cursor(1)}"',
+        "first: 5, last: 2",
+        f'first: 4, last: 3, after: "{offset_to_cursor(0)}"',
+        "first: 0",
+    ],
+)
+async def test_batch_pagination(session, raise_graphql, arguments):
+    await add_test_data(session)
+    schema = get_schema()
+
+    result, statements = await execute(session, schema, arguments)
+    assert "row_number() OVER (PARTITION BY" in statements[-1]
+
+    # all children sliced in python
+    with patch.object(loader_fk, "get_page_bounds", return_value=None):
+        expected, statements = await execute(session, schema, arguments)
+    assert "row_number()" not in statements[-1]
+
+    assert result == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "arguments, count_queries",
+    [
+        ("first: 2", 1),
+        ("first: 2, sort: HEADLINE_DESC", 1),
+        # counted by the window of the page
+        ("last: 2", 0),
+    ],
+)
+async def test_batch_pagination_total_count(
+    session, raise_graphql, arguments, count_queries
+):
+    await add_test_data(session)
+    schema = get_schema()
+
+    result, statements = await execute(session, schema, arguments, total_count=True)
+    assert len(statements) == 2 + count_queries
+    assert "row_number() OVER (PARTITION BY" in statements[1]
+    if count_queries:
+        assert "GROUP BY" in statements[2]
+
+    assert [i["articles"]["totalCount"] for i in result["reporters"]] == [0, 3, 7]
+    assert [len(i["articles"]["edges"]) for i in result["reporters"]] == [0, 2, 2]
+
+    with patch.object(loader_fk, "get_page_bounds", return_value=None):
+        expected, statements = await execute(
+            session, schema, arguments, total_count=True
+        )
+    assert len(statements) == 2
+    assert result == expected
+
+
+@pytest.mark.asyncio
+async def test_batch_total_count_filters(session, raise_graphql):
+    await add_test_data(session)
+
+    class ArticleType(SQLAlchemyObjectType):
+        class Meta:
+            model = Article
+            interfaces = (AsyncNode,)
+            connection_class = CountableConnectionCreator
+            filter_fields = {Article.headline: [OP_EQ]}
+
+    class ReporterType(SQLAlchemyObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (AsyncNode,)
+            connection_field_factory = BatchSQLAlchemyConnectionField.from_relationship
+
+    class Query(graphene.ObjectType):
+        reporters = graphene.Field(graphene.List(ReporterType))
+
+        async def resolve_reporters(self, info):
+            session = info.context.session
+            result = await session.execute(sa.select(Reporter).order_by(Reporter.id))
+            return result.scalars().all()
+
+    schema = graphene.Schema(query=Query)
+    result = await schema.execute_async(
+        """
+        query {
+          reporters {
+            articles(first: 1, headline_Eq: "Reporter_3#1") {
+              totalCount
+              edges {
+                node {
+                  headline
+                }
+              }
+            }
+          }
+        }
+        """,
+        context_value=Context(session=session),
+        middleware=[LoaderMiddleware([Article, Reporter])],
+    )
+
+    assert not result.errors, result.errors
+    assert [i["articles"]["totalCount"] for i in result.data["reporters"]] == [0, 0, 2]
+
+
+@pytest.mark.asyncio
+async def test_batch_aliases(session, raise_graphql):
+    await add_test_data(session)
+    schema = get_schema()
+
+    with patch.object(AsyncSession, "execute", wraps=session.execute) as execute_:
+        result = await schema.execute_async(
+            """
+            query {
+              reporters {
+                first: articles(first: 1) { edges { node { headline } } }
+                desc: articles(first: 2, sort: HEADLINE_DESC) {
+                  edges { node { headline } }
+                }
+                same: articles(first: 1) { edges { node { headline } } }
+                ids: articles(first: 1) { edges { node { id } } }
+              }
+            }
+            """,
+            context_value=Context(session=session),
+            middleware=[LoaderMiddleware([Article, Reporter])],
+        )
+
+    assert not result.errors, result.errors
+
+    def headlines(alias):
+        return [
+            [i["node"]["headline"] for i in reporter[alias]["edges"]]
+            for reporter in result.data["reporters"]
+        ]
+
+    assert headlines("first") == [[], ["Reporter_2#0"], ["Reporter_3#0"]]
+    assert headlines("same") == headlines("first")
+    assert headlines("desc") == [
+        [],
+        ["Reporter_2#2", "Reporter_2#1"],
+        ["Reporter_3#3", "Reporter_3#2"],
+    ]
+    assert [len(i["ids"]["edges"]) for i in result.data["reporters"]] == [0, 1, 1]
+    # reporters, then one query per distinct arguments and selection
+    assert execute_.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_batch_pagination_past_the_end(session, raise_graphql):
+    await add_test_data(session)
+    schema = get_schema()
+
+    result, _ = await execute(
+        session, schema, f'first: 2, after: "{offset_to_cursor(4)}"'
+    )
+    # the cursor is past the children of Reporter_2, the page is empty
+    assert [len(i["articles"]["edges"]) for i in result["reporters"]] == [0, 0, 2]
+    assert [i["articles"]["pageInfo"]["hasNextPage"] for i in result["reporters"]] == [
+        False,
+        False,
+        False,
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "arguments",
+    [
+        "first: 2, sort: HEADLINE_DESC",
+        f'first: 2, after: "{offset_to_cursor(1)}"',
+        "last: 2",
+    ],
+)
+async def test_batch_pagination_lateral_fallback(session, raise_graphql, arguments):
+    await add_test_data(session)
+
+    with patch.dict(ARTICLES_FK.info, {LOADER_STRATEGY_INFO: LOADER_LATERAL}):
+        schema = get_schema()
+
+    # no LATERAL on SQLite, the window is used
+    result, statements = await execute(session, schema, arguments)
+    assert "row_number() OVER (PARTITION BY" in statements[-1]
+
+    expected, _ = await execute(session, get_schema(), arguments)
+    assert result == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "field, where",
+    [
+        ("articles", "WHERE articles.reporter_id = anon_2.key"),
+        ("pets", "WHERE reporters.id = anon_2.key"),
+    ],
+)
+async def test_batch_pagination_lateral(session, field, where):
+    await add_test_data(session)
+
+    with patch.dict(ARTICLES_FK.info, {LOADER_STRATEGY_INFO: LOADER_LATERAL}):
+        schema = get_schema(loader_strategy=LOADER_LATERAL)
+
+    with patch.object(BaseLoader, "supports_lateral", return_value=True):
+        with patch.object(AsyncSession, "execute", wraps=session.execute) as execute_:
+            # unnest does not exist in SQLite
+            result = await schema.execute_async(
+                """
+                query {
+                  reporters {
+                    %s(first: 2, after: "%s") {
+                      edges {
+                        node {
+                          id
+                        }
+                      }
+                    }
+                  }
+                }
+                """
+                % (field, offset_to_cursor(1)),
+                context_value=Context(session=session),
+                middleware=[LoaderMiddleware([Article, Pet, Reporter])],
+            )
+
+    assert result.errors
+    statement = str(
+        execute_.call_args_list[-1].args[0].compile(dialect=postgresql.dialect())
+    )
+    assert (
+        "FROM unnest(%(keys)s::INTEGER[]) AS anon_2(key) JOIN LATERAL (SELECT"
+        in statement
+    )
+    assert where in statement
+    assert "LIMIT %(param_1)s OFFSET %(param_2)s" in statement
+    assert "PARTITION BY" not in statement
@@ -852,3 +852,36 @@ async def test_only_ids(session, raise_graphql):
             {"articles": {"edges": []}},
         ]
     }
+
+
+@pytest.mark.asyncio
+async def test_loaders_per_operation(session, raise_graphql):
+    for name in ("Reporter_1", "Reporter_2"):
+        reporter_id = (
+            await session.execute(sa.insert(Reporter).values({"first_name": name}))
+        ).lastrowid
+        await session.execute(
+            sa.insert(Article).values({"headline": name, "reporter_id": reporter_id})
+        )
+
+    schema = get_schema()
+    context = Context(session=session)
+    with patch.object(AsyncSession, "execute", wraps=session.execute) as execute:
+        result = await schema.execute_async(
+            """
+            query {
+              articles { reporter { firstName } }
+              again: articles { reporter { firstName } }
+            }
+            """,
+            context_value=context,
+            middleware=[
+                LoaderMiddleware([Article, Reporter, Pet]),
+            ],
+        )
+
+    assert not result.errors
+    assert result.data["again"] == result.data["articles"]
+    # both root fields share the loader created on first use
+    assert len(context.loaders) == 1
+    assert execute.call_count == 3
@@ -1,12 +1,23 @@
+import datetime
+import tracemalloc
+from types import SimpleNamespace
+from unittest.mock import patch
+
 import graphene
 import pytest
 import sqlalchemy as sa
 from graphene import Context
+from graphql import parse
+from graphql.pyutils import Path
 
-from .models import Article, HairKind, Pet, Reporter
-from alchql.fields import BatchSQLAlchemyConnectionField
+from .models import Article, Editor, HairKind, Pet, Reporter
+from alchql.encoders import encode_json, orjson_encoder, stdlib_json_encoder
+from alchql.fields import BatchSQLAlchemyConnectionField, FilterConnectionField
+from alchql.gql_fields import camel_to_snake
 from alchql.middlewares import LoaderMiddleware
 from alchql.node import AsyncNode
+from alchql.projection import get_projection
+from alchql.query_helper import QueryHelper
 from alchql.types import SQLAlchemyObjectType
 
 
@@ -233,3 +244,230 @@ async def test_many_to_many(session, benchmark):
       }
     """,
     )
+
+
+def test_multiple_roots_parse_once(session, event_loop, benchmark):
+    class EditorType(SQLAlchemyObjectType):
+        class Meta:
+            model = Editor
+            interfaces = (AsyncNode,)
+
+    class Query(graphene.ObjectType):
+        editors = FilterConnectionField(EditorType, sort=None)
+
+    event_loop.run_until_complete(
+        session.execute(
+            sa.insert(Editor).values([{Editor.name: f"Editor#{i}"} for i in range(10)])
+        )
+    )
+
+    roots = 5
+    query = "query {%s}" % " ".join(
+        f"e{i}: editors(first: {i + 1}) {{ pageInfo {{ hasNextPage }} edges {{ node {{ name }} }} }}"
+        for i in range(roots)
+    )
+    schema = graphene.Schema(query=Query)
+
+    with patch.object(
+        QueryHelper, "get_selection_plan", wraps=QueryHelper.get_selection_plan
+    ) as get_selection_plan:
+
+        @benchmark
+        def execute_query():
+            get_selection_plan.reset_mock()
+            result = event_loop.run_until_complete(
+                schema.execute_async(
+                    query,
+                    context_value=Context(session=session),
+                    middleware=[LoaderMiddleware([Editor])],
+                )
+            )
+            assert not result.errors
+            assert get_selection_plan.call_count == roots
+
+
+def get_wide_query_info(width=250):
+    def selection(prefix, depth):
+        fields = [f"{prefix}{i}" for i in range(width)]
+        if depth:
+            fields[-1] += " {%s}" % selection(chr(ord(prefix) + 1), depth - 1)
+        return " ".join(fields)
+
+    document = parse("query { items { %s } }" % selection("f", 2))
+    operation = document.definitions[0]
+
+    path = Path(None, "items", "Query")
+    for prefix in "fgh":
+        path = path.add_key(f"{prefix}{width - 1}", prefix.upper())
+
+    return SimpleNamespace(
+        context=SimpleNamespace(),
+        field_name=path.key,
+        field_nodes=operation.selection_set.selections,
+        fragments={},
+        operation=operation,
+        path=path,
+        variable_values={},
+    )
+
+
+@pytest.mark.benchmark(group="get_current_field")
+def test_wide_current_field_indexed(benchmark):
+    info = get_wide_query_info()
+    QueryHelper.get_current_field(info)
+
+    result = benchmark(QueryHelper.get_current_field, info)
+    assert result.name == camel_to_snake(info.path.key)
+
+
+class ArticleRecordType(SQLAlchemyObjectType):
+    class Meta:
+        model = Article
+        interfaces = (AsyncNode,)
+        skip_registry = True
+
+
+class ArticleSlottedRecordType(SQLAlchemyObjectType):
+    class Meta:
+        model = Article
+        interfaces = (AsyncNode,)
+        skip_registry = True
+        slotted_records = True
+
+
+RECORD_ROWS = [
+    (i, f"Article#{i}", datetime.date(2020, 1, 1), i % 100) for i in range(100_000)
+]
+
+
+def build_records(object_type):
+    projection = get_projection(
+        ("id", "headline", "pub_date", "reporter_id"), object_type
+    )
+    return projection.all(RECORD_ROWS)
+
+
+def measure_records_memory(object_type) -> int:
+    build_records(object_type)
+    tracemalloc.start()
+    try:
+        records = build_records(object_type)
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(records) == len(RECORD_ROWS)
+    return size
+
+
+@pytest.mark.benchmark(group="records")
+@pytest.mark.parametrize("object_type", [ArticleRecordType, ArticleSlottedRecordType])
+def test_records_of_100k_rows(benchmark, object_type):
+    # bytes of 100k nodes, compared by `--benchmark-columns` or the json report
+    benchmark.extra_info["memory"] = measure_records_memory(object_type)
+    benchmark(build_records, object_type)
+
+
+def test_slotted_records_memory():
+    memory = measure_records_memory(ArticleRecordType)
+    slotted_memory = measure_records_memory(ArticleSlottedRecordType)
+    assert slotted_memory < memory * 0.75
+
+
+STREAMED_ROWS = 5_000
+
+
+def get_streaming_schema(yield_per):
+    class EditorType(SQLAlchemyObjectType):
+        class Meta:
+            model = Editor
+            interfaces = (AsyncNode,)
+
+    class Query(graphene.ObjectType):
+        editors = FilterConnectionField(EditorType, sort=None, yield_per=yield_per)
+
+    return graphene.Schema(query=Query)
+
+
+def execute_streaming_query(session, event_loop, schema):
+    result = event_loop.run_until_complete(
+        schema.execute_async(
+            # edges are built but not serialized, the peak is the page itself
+            "query { editors(first: %d) { pageInfo { hasNextPage } } }" % STREAMED_ROWS,
+            context_value=Context(session=session),
+            middleware=[LoaderMiddleware([Editor])],
+        )
+    )
+    assert not result.errors
+    assert result.data["editors"]["pageInfo"] == {"hasNextPage": False}
+
+
+def measure_peak_memory(session, event_loop, schema) -> int:
+    execute_streaming_query(session, event_loop, schema)
+    tracemalloc.start()
+    try:
+        execute_streaming_query(session, event_loop, schema)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def add_streamed_editors(session, event_loop):
+    event_loop.run_until_complete(
+        session.execute(
+            sa.insert(Editor).values(
+                [{Editor.name: f"Editor#{i}" * 10} for i in range(STREAMED_ROWS)]
+            )
+        )
+    )
+
+
+@pytest.mark.benchmark(group="streaming")
+@pytest.mark.parametrize("yield_per", [None, 100])
+def test_connection_streaming(session, event_loop, benchmark, yield_per):
+    add_streamed_editors(session, event_loop)
+    schema = get_streaming_schema(yield_per)
+
+    # peak bytes of the page, compared by the json report
+    benchmark.extra_info["peak_memory"] = measure_peak_memory(
+        session, event_loop, schema
+    )
+    benchmark(execute_streaming_query, session, event_loop, schema)
+
+
+# a page of 10k nodes, about 2 MB encoded
+JSON_PAYLOAD = {
+    "data": {
+        "articles": {
+            "totalCount": 10_000,
+            "edges": [
+                {
+                    "cursor": f"YXJyYXljb25uZWN0aW9uOj{i}",
+                    "node": {
+                        "id": f"QXJ0aWNsZVR5cGU6{i}",
+                        "headline": f"Article#{i} headline",
+                        "pubDate": "2020-01-01",
+                        "views": i * 7,
+                        "rating": i / 3,
+                        "reporter": {"firstName": "John", "lastName": None},
+                    },
+                }
+                for i in range(10_000)
+            ],
+        }
+    }
+}
+
+
+@pytest.mark.benchmark(group="json")
+@pytest.mark.parametrize("encoder", [stdlib_json_encoder, orjson_encoder])
+def test_json_encoders(benchmark, encoder):
+    assert benchmark(encoder, JSON_PAYLOAD)
+
+
+@pytest.mark.benchmark(group="json")
+@pytest.mark.parametrize("encoder", [stdlib_json_encoder, orjson_encoder])
+def test_json_encoders_chunked(event_loop, benchmark, encoder):
+    @benchmark
+    def encode():
+        return event_loop.run_until_complete(encode_json(JSON_PAYLOAD, encoder))
@@ -5,11 +5,19 @@ import pytest
 import sqlalchemy as sa
 from graphene import Context
 
-from alchql.connection import from_query
+from alchql.connection import (
+    CachedCount,
+    CappedCount,
+    EstimatedCount,
+    ExactCount,
+    from_query,
+)
 from alchql.consts import OP_ILIKE
+from alchql.extensions import TotalCountExtension
 from alchql.fields import FilterConnectionField
 from alchql.middlewares import LoaderMiddleware
 from alchql.node import AsyncNode
+from alchql.statement_stats import statement_stats
 from alchql.types import SQLAlchemyObjectType
 from .models import Editor
 
@@ -45,7 +53,7 @@ class CountableConnectionCreator:
         return CountableConnection
 
 
-async def get_query():
+async def get_query(window_count=False, count_strategy=None, yield_per=None):
     class EditorType(SQLAlchemyObjectType):
         class Meta:
             model = Editor
@@ -57,7 +65,13 @@ async def get_query():
 
     class Query(graphene.ObjectType):
         node = graphene.relay.Node.Field()
-        editors = FilterConnectionField(EditorType, sort=EditorType.sort_argument())
+        editors = FilterConnectionField(
+            EditorType,
+            sort=EditorType.sort_argument(),
+            window_count=window_count,
+            count_strategy=count_strategy,
+            yield_per=yield_per,
+        )
 
     return Query
 
@@ -88,3 +102,140 @@ async def test_counters(session, raise_graphql):
 
     assert not result.errors
     assert result.data == {"editors": {"count": 50, "totalCount": 100}}
+
+
+@pytest.fixture
+def stats():
+    statement_stats.clear()
+    statement_stats.enable()
+    yield statement_stats
+    statement_stats.disable()
+    statement_stats.clear()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "arguments, count, total_count, count_queries",
+    [
+        ('first: 10, name_Ilike: "Editor#1%"', 10, 11, 0),
+        ('first: 10, after: "YXJyYXljb25uZWN0aW9uOjk1"', 4, 100, 0),
+        # page past the end still reports the total
+        ('first: 10, after: "YXJyYXljb25uZWN0aW9uOjEwMA=="', 0, 100, 1),
+        ('first: 10, name_Ilike: "missing"', 0, 0, 0),
+        # offsets depend on the count
+        ("last: 10", 10, 100, 1),
+    ],
+)
+@pytest.mark.parametrize("yield_per", [None, 3])
+async def test_window_count(
+    session,
+    raise_graphql,
+    stats,
+    arguments,
+    count,
+    total_count,
+    count_queries,
+    yield_per,
+):
+    await add_test_data(session)
+
+    query = """
+    query {
+      editors(%s) {
+        count
+        totalCount
+      }
+    }
+    """
+
+    schema = graphene.Schema(
+        query=await get_query(window_count=True, yield_per=yield_per)
+    )
+    result = await schema.execute_async(
+        query % arguments,
+        context_value=Context(session=session),
+        middleware=[
+            LoaderMiddleware([Editor]),
+        ],
+    )
+
+    assert not result.errors
+    assert result.data == {"editors": {"count": count, "totalCount": total_count}}
+
+    count_info = stats.info().get("count:Query.editors")
+    assert (sum(count_info) if count_info else 0) == count_queries
+
+
+async def get_total_count(session, schema, arguments="first: 1"):
+    context = Context(session=session)
+    result = await schema.execute_async(
+        "query { editors(%s) { totalCount } }" % arguments,
+        context_value=context,
+        middleware=[
+            LoaderMiddleware([Editor]),
+        ],
+    )
+
+    assert not result.errors
+    extensions = TotalCountExtension().format(context)
+    assert extensions["totalCount"]["editors"]["value"] == (
+        result.data["editors"]["totalCount"]
+    )
+    return extensions["totalCount"]["editors"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "count_strategy, arguments, expected",
+    [
+        (ExactCount(), "last: 1", (100, True, "exact")),
+        (CappedCount(10), "first: 1", (10, False, "capped")),
+        (CappedCount(11), 'first: 1, name_Ilike: "Editor#1%"', (11, True, "capped")),
+        # no planner estimates on SQLite
+        (EstimatedCount(), "first: 1", (100, True, "exact")),
+        (EstimatedCount(CappedCount(10)), "first: 1", (10, False, "capped")),
+        # the window is an exact count, other strategies replace it
+        (None, "first: 1", (100, True, "window")),
+        (CappedCount(10), "last: 1", (100, True, "exact")),
+    ],
+)
+async def test_count_strategy(
+    session, raise_graphql, count_strategy, arguments, expected
+):
+    await add_test_data(session)
+    schema = graphene.Schema(
+        query=await get_query(window_count=True, count_strategy=count_strategy)
+    )
+
+    result = await get_total_count(session, schema, arguments)
+    assert (result["value"], result["exact"], result["strategy"]) == expected
+
+
+@pytest.mark.asyncio
+async def test_cached_count(session, raise_graphql, stats):
+    await add_test_data(session)
+    count_strategy = CachedCount(CappedCount(1000), ttl=60)
+    schema = graphene.Schema(query=await get_query(count_strategy=count_strategy))
+
+    assert (await get_total_count(session, schema))["strategy"] == "capped"
+    await session.execute(sa.insert(Editor).values({Editor.name: "Editor#100"}))
+
+    # stale until the entry expires
+    result = await get_total_count(session, schema)
+    assert (result["value"], result["strategy"]) == (100, "cached")
+
+    # keyed by filter values
+    result = await get_total_count(session, schema, 'first: 1, name_Ilike: "%#10%"')
+    assert (result["value"], result["strategy"]) == (2, "capped")
+    result = await get_total_count(session, schema, 'first: 1, name_Ilike: "%#9%"')
+    assert (result["value"], result["strategy"]) == (11, "capped")
+    result = await get_total_count(session, schema, 'first: 1, name_Ilike: "%#10%"')
+    assert (result["value"], result["strategy"]) == (2, "cached")
+
+    assert sum(stats.info()["count:Query.editors"]) == 3
+
+    with mock.patch.object(count_strategy, "ttl", -1):
+        count_strategy.cache.clear()
+        await get_total_count(session, schema)
+        result = await get_total_count(session, schema)
+    assert (result["value"], result["strategy"]) == (101, "capped")
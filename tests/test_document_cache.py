@@ -0,0 +1,45 @@
+from unittest.mock import patch
+
+import pytest
+
+from alchql import app as app_module
+from .test_persisted_queries import call, get_app, QUERY
+
+
+@pytest.mark.asyncio
+async def test_document_cache(engine):
+    app = get_app(engine)
+
+    with patch.object(app_module, "validate", wraps=app_module.validate) as validate:
+        for _ in range(3):
+            status, body = await call(app, body={"query": QUERY})
+            assert (status, body) == (200, {"data": {"hello": "world"}})
+
+    assert validate.call_count == 1
+    info = app.document_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_document_cache_errors(engine):
+    app = get_app(engine)
+
+    for query in ("query { missing }", "query {"):
+        for _ in range(2):
+            status, body = await call(app, body={"query": query})
+            assert status == 200
+            assert body["data"] is None
+            assert len(body["errors"]) == 1
+
+    info = app.document_cache_info()
+    assert (info.hits, info.misses) == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_document_cache_disabled(engine):
+    app = get_app(engine, document_cache_size=0)
+    for _ in range(2):
+        status, _ = await call(app, body={"query": QUERY})
+        assert status == 200
+
+    assert app.document_cache_info().currsize == 0
@@ -0,0 +1,58 @@
+import datetime
+import decimal
+import enum
+import json
+import uuid
+
+import pytest
+
+from alchql.encoders import encode_json, orjson_encoder, stdlib_json_encoder
+
+
+class Color(enum.Enum):
+    RED = "red"
+
+
+CONTENT = {
+    "data": {
+        "items": [
+            {"id": i, "name": f"Item#{i}", "tags": ["a", "b"], "empty": {}}
+            for i in range(25)
+        ],
+        "count": 25,
+        "missing": None,
+    },
+    "extensions": {1: "non str key"},
+}
+
+
+@pytest.mark.parametrize("encoder", [stdlib_json_encoder, orjson_encoder])
+def test_native_types(encoder):
+    content = {
+        "date": datetime.date(2020, 1, 2),
+        "datetime": datetime.datetime(2020, 1, 2, 3, 4, 5),
+        "uuid": uuid.UUID(int=1),
+        "decimal": decimal.Decimal("1.10"),
+        "enum": Color.RED,
+        "text": "Привет",
+    }
+    assert json.loads(encoder(content)) == {
+        "date": "2020-01-02",
+        "datetime": "2020-01-02T03:04:05",
+        "uuid": "00000000-0000-0000-0000-000000000001",
+        "decimal": "1.10",
+        "enum": "red",
+        "text": "Привет",
+    }
+
+
+def test_orjson_big_integers():
+    assert json.loads(orjson_encoder({"value": 2**70})) == {"value": 2**70}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("encoder", [stdlib_json_encoder, orjson_encoder])
+@pytest.mark.parametrize("chunk_size", [None, 1, 7, 25, 100])
+async def test_encode_json(encoder, chunk_size):
+    encoded = await encode_json(CONTENT, encoder, chunk_size)
+    assert json.loads(encoded) == json.loads(stdlib_json_encoder(CONTENT))
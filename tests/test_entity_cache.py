@@ -0,0 +1,175 @@
+from unittest.mock import patch
+
+import graphene
+import pytest
+import sqlalchemy as sa
+from graphene import Context
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from alchql.entity_cache import (
+    EntityCacheKey,
+    EntityCachePolicy,
+    InProcessEntityCache,
+)
+from alchql.gql_id import ResolvedGlobalId
+from alchql.middlewares import LoaderMiddleware
+from alchql.node import AsyncNode
+from alchql.sql_mutation import SQLAlchemyUpdateMutation
+from alchql.types import SQLAlchemyObjectType
+from .models import Article, Reporter
+
+QUERY = """
+    query {
+        articles {
+            headline
+            reporter {
+                firstName
+            }
+        }
+    }
+"""
+
+
+def get_schema(policy=EntityCachePolicy(ttl=60)):
+    class ReporterType(SQLAlchemyObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (AsyncNode,)
+            entity_cache = policy
+
+    class ArticleType(SQLAlchemyObjectType):
+        class Meta:
+            model = Article
+            interfaces = (AsyncNode,)
+
+    class UpdateReporter(SQLAlchemyUpdateMutation):
+        class Meta:
+            model = Reporter
+            output = ReporterType
+
+    class Query(graphene.ObjectType):
+        articles = graphene.Field(graphene.List(ArticleType))
+
+        async def resolve_articles(self, info):
+            session = info.context.session
+            result = await session.execute(sa.select(Article).order_by(Article.id))
+            return result.scalars().all()
+
+    class Mutation(graphene.ObjectType):
+        update_reporter = UpdateReporter.Field()
+
+    return graphene.Schema(query=Query, mutation=Mutation)
+
+
+async def add_articles(session):
+    for name in ("Reporter_1", "Reporter_2"):
+        reporter_id = (
+            await session.execute(sa.insert(Reporter).values({"first_name": name}))
+        ).lastrowid
+        await session.execute(
+            sa.insert(Article).values(
+                {"headline": f"Article of {name}", "reporter_id": reporter_id}
+            )
+        )
+
+
+async def execute(schema, session, entity_cache, query=QUERY, **kwargs):
+    with patch.object(AsyncSession, "execute", wraps=session.execute) as mock:
+        result = await schema.execute_async(
+            query,
+            context_value=Context(session=session),
+            middleware=[LoaderMiddleware([Article, Reporter], entity_cache)],
+            **kwargs,
+        )
+
+    assert not result.errors
+    return result.data, mock.call_count
+
+
+def get_names(data):
+    return [i["reporter"]["firstName"] for i in data["articles"]]
+
+
+@pytest.mark.asyncio
+async def test_entity_cache(session):
+    await add_articles(session)
+    entity_cache = InProcessEntityCache()
+    schema = get_schema()
+
+    data, calls = await execute(schema, session, entity_cache)
+    assert get_names(data) == ["Reporter_1", "Reporter_2"]
+    assert calls == 2
+
+    data, calls = await execute(schema, session, entity_cache)
+    assert get_names(data) == ["Reporter_1", "Reporter_2"]
+    # reporters come from the cache
+    assert calls == 1
+    assert entity_cache.info()["reporters"].currsize == 2
+
+
+@pytest.mark.asyncio
+async def test_entity_cache_without_policy(session):
+    await add_articles(session)
+    entity_cache = InProcessEntityCache()
+    schema = get_schema(policy=None)
+
+    for _ in range(2):
+        _, calls = await execute(schema, session, entity_cache)
+        assert calls == 2
+
+    assert entity_cache.info() == {}
+
+
+@pytest.mark.asyncio
+async def test_entity_cache_invalidated_by_mutation(session):
+    await add_articles(session)
+    entity_cache = InProcessEntityCache()
+    schema = get_schema()
+    await execute(schema, session, entity_cache)
+
+    reporter_id = (await session.execute(sa.select(sa.func.min(Reporter.id)))).scalar()
+    await execute(
+        schema,
+        session,
+        entity_cache,
+        query="""
+            mutation ($id: ID!) {
+                updateReporter(id: $id, value: {firstName: "Renamed"}) {
+                    firstName
+                }
+            }
+        """,
+        variable_values={"id": ResolvedGlobalId("ReporterType", reporter_id).encode()},
+    )
+    assert entity_cache.info()["reporters"].currsize == 0
+
+    data, calls = await execute(schema, session, entity_cache)
+    assert get_names(data) == ["Renamed", "Reporter_2"]
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_in_process_entity_cache():
+    entity_cache = InProcessEntityCache()
+    policy = EntityCachePolicy(ttl=60, maxsize=2)
+    keys = [
+        EntityCacheKey("reporters", "articles.reporter_id", i, ("id",))
+        for i in range(3)
+    ]
+
+    await entity_cache.set_many(
+        {key: [(key.value,)] for key in keys},
+        policy,
+        frozenset(["reporters", "articles"]),
+    )
+    # bounded by the policy of the table
+    assert await entity_cache.get_many(keys) == [None, [(1,)], [(2,)]]
+
+    # entries read from a written table are dropped
+    await entity_cache.invalidate("articles")
+    assert await entity_cache.get_many(keys) == [None, None, None]
+
+    await entity_cache.set_many(
+        {keys[0]: []}, policy._replace(ttl=0), frozenset(["reporters"])
+    )
+    assert await entity_cache.get_many(keys[:1]) == [None]
@@ -7,11 +7,12 @@ from graphene import (
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from alchql.consts import OP_EQ
+from alchql.consts import OP_EQ, OP_IN
 from alchql.fields import (
     BatchSQLAlchemyConnectionField,
     FilterConnectionField,
 )
+from alchql.gql_id import ResolvedGlobalId
 from alchql.middlewares import LoaderMiddleware
 from alchql.node import AsyncNode
 from alchql.types import (
@@ -149,3 +150,38 @@ async def test_filter3(session):
 
     assert not result.errors
     assert result.data["reporter"]["edges"][0]["node"]["firstName"] == "first_name"
+
+
+@pytest.mark.asyncio
+async def test_filter_global_ids(session):
+    class ReporterType(SQLAlchemyObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (AsyncNode,)
+            filter_fields = {
+                Reporter.first_name: [OP_EQ, OP_IN],
+            }
+
+    class Query(ObjectType):
+        reporter = FilterConnectionField(ReporterType, sort=None)
+
+    reporter_id = await add_reporter(session)
+    await add_reporter(session)
+    global_id = ResolvedGlobalId("ReporterType", reporter_id).encode()
+
+    schema = Schema(query=Query, types=[ReporterType])
+    for arguments in (
+        f'id_Eq: "{global_id}"',
+        f'id_In: ["{global_id}"]',
+        f'id_In: ["{global_id}"], firstName_In: ["first_name", "other"]',
+    ):
+        result = await schema.execute_async(
+            "query { reporter(%s) { edges { node { id } } } }" % arguments,
+            context_value=Context(session=session),
+            middleware=[
+                LoaderMiddleware([Reporter]),
+            ],
+        )
+
+        assert not result.errors
+        assert result.data["reporter"]["edges"] == [{"node": {"id": global_id}}]
@@ -99,3 +99,43 @@ async def test_query_fragments(session):
             },
         }
     }
+
+
+@pytest.mark.asyncio
+async def test_query_inline_fragment_siblings(session):
+    await add_test_data(session)
+
+    query = """
+    query {
+      reporters {
+        edges {
+          node {
+            firstName
+            ... on ReporterType {
+              lastName
+            }
+            email
+          }
+        }
+      }
+    }
+    """
+
+    schema = graphene.Schema(query=await get_query())
+    result = await schema.execute_async(
+        query,
+        context_value=Context(session=session),
+        middleware=[
+            LoaderMiddleware([Editor]),
+        ],
+    )
+
+    assert not result.errors
+    assert result.data == {
+        "reporters": {
+            "edges": [
+                {"node": {"firstName": "John", "lastName": "Doe", "email": "email"}},
+                {"node": {"firstName": "John1", "lastName": "Doe1", "email": "email1"}},
+            ],
+        }
+    }
@@ -0,0 +1,159 @@
+import graphene
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from alchql.app import SessionQLApp
+from alchql.middlewares import LoaderMiddleware
+from alchql.node import AsyncNode
+from alchql.sql_mutation import SQLAlchemyCreateMutation
+from alchql.types import SQLAlchemyObjectType
+from .models import Article, Reporter
+from .test_persisted_queries import call
+
+QUERY = "query { articles { headline reporter { firstName } } }"
+
+
+def get_app(engine, **kwargs):
+    class ReporterType(SQLAlchemyObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (AsyncNode,)
+
+    class ArticleType(SQLAlchemyObjectType):
+        class Meta:
+            model = Article
+            interfaces = (AsyncNode,)
+
+    class CreateReporter(SQLAlchemyCreateMutation):
+        class Meta:
+            model = Reporter
+            output = ReporterType
+
+    class Query(graphene.ObjectType):
+        articles = graphene.Field(graphene.List(ArticleType))
+        reporters_count = graphene.Int()
+
+        async def resolve_articles(self, info):
+            session = info.context.session
+            result = await session.execute(sa.select(Article).order_by(Article.id))
+            return result.scalars().all()
+
+        async def resolve_reporters_count(self, info):
+            session = info.context.session
+            return (
+                await session.execute(sa.select(sa.func.count(Reporter.id)))
+            ).scalar()
+
+    class Mutation(graphene.ObjectType):
+        create_reporter = CreateReporter.Field()
+
+    return SessionQLApp(
+        schema=graphene.Schema(query=Query, mutation=Mutation),
+        engine=engine,
+        middleware=[LoaderMiddleware([Article, Reporter])],
+        **kwargs,
+    )
+
+
+async def add_articles(engine):
+    async with AsyncSession(engine) as session, session.begin():
+        for name in ("Reporter_1", "Reporter_2"):
+            reporter_id = (
+                await session.execute(sa.insert(Reporter).values({"first_name": name}))
+            ).lastrowid
+            await session.execute(
+                sa.insert(Article).values(
+                    {"headline": f"Article of {name}", "reporter_id": reporter_id}
+                )
+            )
+
+
+def count_selects(engine):
+    statements = []
+
+    @sa.event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    return statements
+
+
+@pytest.mark.asyncio
+async def test_batch(engine):
+    await add_articles(engine)
+    app = get_app(engine)
+    statements = count_selects(engine)
+
+    status, body = await call(
+        app,
+        body=[
+            {"query": QUERY},
+            {"query": "query { reportersCount }"},
+            {"query": QUERY},
+        ],
+    )
+
+    articles = {
+        "data": {
+            "articles": [
+                {
+                    "headline": "Article of Reporter_1",
+                    "reporter": {"firstName": "Reporter_1"},
+                },
+                {
+                    "headline": "Article of Reporter_2",
+                    "reporter": {"firstName": "Reporter_2"},
+                },
+            ]
+        }
+    }
+    assert status == 200
+    assert body == [articles, {"data": {"reportersCount": 2}}, articles]
+    # both operations read the reporters with one loader query
+    assert len(statements) == 4
+
+
+@pytest.mark.asyncio
+async def test_batch_with_mutation(engine):
+    app = get_app(engine)
+    mutation = 'mutation { createReporter(value: {firstName: "New"}) { firstName } }'
+
+    status, body = await call(
+        app,
+        body=[
+            {"query": mutation},
+            {"query": "query { reportersCount }"},
+            {"query": "query { missing }"},
+            {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": "0" * 64}}},
+        ],
+    )
+
+    assert status == 200
+    assert body[0] == {"data": {"createReporter": {"firstName": "New"}}}
+    # operations run in order in one transaction
+    assert body[1] == {"data": {"reportersCount": 1}}
+    assert body[2]["errors"]
+    assert body[3]["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+
+    # rolled back with the failed operation
+    status, body = await call(app, body={"query": "query { reportersCount }"})
+    assert body == {"data": {"reportersCount": 0}}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "max_batch_size, operations, message",
+    [
+        (0, 1, "This server does not support batching"),
+        (2, 3, "Batches hold 1 to 2 operations"),
+        (2, 0, "Batches hold 1 to 2 operations"),
+    ],
+)
+async def test_batch_size(engine, max_batch_size, operations, message):
+    app = get_app(engine, max_batch_size=max_batch_size)
+    status, body = await call(
+        app, body=[{"query": "query { reportersCount }"}] * operations
+    )
+    assert (status, body) == (400, {"errors": [message]})
@@ -0,0 +1,123 @@
+import pytest
+import sqlalchemy as sa
+from graphene import Context, ObjectType, Schema
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from alchql.consts import OP_IN
+from alchql.fields import FilterConnectionField
+from alchql.gql_id import ResolvedGlobalId
+from alchql.key_sets import (
+    IN_BUCKETS,
+    key_set_clause,
+    KEY_SET_THRESHOLD,
+    pad_keys,
+)
+from alchql.middlewares import LoaderMiddleware
+from alchql.node import AsyncNode
+from alchql.types import SQLAlchemyObjectType
+from .models import Article, Reporter
+
+
+def compile_where(clause, dialect):
+    return str(sa.select(Article.id).where(clause).compile(dialect=dialect))
+
+
+def test_pad_keys():
+    assert pad_keys([1, 2, 3]) == [1, 2, 3] + [3] * (IN_BUCKETS[0] - 3)
+    assert len(pad_keys(list(range(IN_BUCKETS[0] + 1)))) == IN_BUCKETS[1]
+    keys = list(range(KEY_SET_THRESHOLD + 1))
+    assert pad_keys(keys) == keys
+
+
+def test_key_set_clause_postgresql():
+    dialect = postgresql.dialect()
+    for size in (1, 100, KEY_SET_THRESHOLD * 2):
+        clause = key_set_clause(Article.reporter_id, range(size), dialect)
+        assert "articles.reporter_id = ANY (%(param_1)s::INTEGER[])" in compile_where(
+            clause, dialect
+        )
+
+
+def test_key_set_clause_buckets():
+    # batches of different sizes expand to the statement of their bucket
+    statements = {
+        str(
+            sa.select(Article.id)
+            .where(key_set_clause(Article.reporter_id, range(size), sqlite.dialect()))
+            .compile(
+                dialect=sqlite.dialect(),
+                compile_kwargs={"render_postcompile": True},
+            )
+        )
+        for size in range(1, KEY_SET_THRESHOLD + 1)
+    }
+    assert len(statements) == len(IN_BUCKETS)
+
+
+def test_key_set_clause_above_threshold():
+    keys = list(range(KEY_SET_THRESHOLD + 1))
+
+    clause = key_set_clause(Article.reporter_id, keys, sqlite.dialect())
+    assert "IN (SELECT anon_1.value \nFROM json_each(?) AS anon_1)" in (
+        compile_where(clause, sqlite.dialect())
+    )
+
+    clause = key_set_clause(Article.reporter_id, keys, mysql.dialect())
+    compiled = compile_where(clause, mysql.dialect())
+    assert "IN (SELECT `keys`.`key` \nFROM (VALUES (0), (1)" in compiled
+
+    # no literal form, kept as bound parameters
+    keys = [object() for _ in keys]
+    clause = key_set_clause(Article.reporter_id, keys, sqlite.dialect())
+    assert "json_each" not in compile_where(clause, sqlite.dialect())
+
+
+@pytest.mark.asyncio
+async def test_id_in_above_threshold(session):
+    class ReporterType(SQLAlchemyObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (AsyncNode,)
+            filter_fields = {
+                Reporter.first_name: [OP_IN],
+            }
+
+    class Query(ObjectType):
+        reporters = FilterConnectionField(ReporterType, sort=None)
+
+    await session.execute(
+        sa.insert(Reporter).values(
+            [
+                {
+                    "first_name": str(i),
+                    "last_name": "",
+                    "email": "",
+                    "favorite_pet_kind": "cat",
+                }
+                for i in range(KEY_SET_THRESHOLD + 10)
+            ]
+        )
+    )
+    ids = (await session.execute(sa.select(Reporter.id))).scalars().all()
+    global_ids = [ResolvedGlobalId("ReporterType", i).encode() for i in ids]
+    names = [str(i) for i in range(0, KEY_SET_THRESHOLD + 10, 2)]
+
+    schema = Schema(query=Query, types=[ReporterType])
+    result = await schema.execute_async(
+        """
+        query ($ids: [ID], $names: [String]) {
+            reporters(id_In: $ids, firstName_In: $names, first: 1000) {
+                edges { node { firstName } }
+            }
+        }
+        """,
+        variable_values={"ids": global_ids[1:], "names": names},
+        context_value=Context(session=session),
+        middleware=[
+            LoaderMiddleware([Reporter]),
+        ],
+    )
+
+    assert not result.errors
+    first_names = [i["node"]["firstName"] for i in result.data["reporters"]["edges"]]
+    assert sorted(first_names) == sorted(names[1:])
@@ -0,0 +1,47 @@
+import sqlalchemy as sa
+from sqlalchemy.orm import declarative_base
+
+from alchql import model_index
+from alchql.model_index import get_model_index, get_model_info
+from alchql.utils import table_to_class
+from .models import Article, Pet, Reporter, association_table
+
+
+def test_model_info():
+    info = get_model_info(Reporter)
+    assert info.model is Reporter
+    assert info.table is Reporter.__table__
+    assert info.primary_key == (Reporter.__table__.c.id,)
+
+    article_fk = next(iter(Article.__table__.c.reporter_id.foreign_keys))
+    assert get_model_info(Article).foreign_keys == (article_fk,)
+    assert article_fk in info.reverse_foreign_keys
+    # foreign keys of unmapped tables are not part of the index
+    assert not any(
+        fk.parent.table is association_table for fk in info.reverse_foreign_keys
+    )
+
+
+def test_table_to_class():
+    assert table_to_class(Reporter.__table__) is Reporter
+    assert table_to_class(Pet.__table__) is Pet
+    assert table_to_class(association_table) is None
+
+
+def test_model_index_rebuilt_for_new_mappers():
+    index = get_model_index()
+    assert get_model_index() is index
+
+    class Spam(declarative_base()):
+        __tablename__ = "spam"
+        id = sa.Column(sa.Integer, primary_key=True)
+
+    assert model_index._index is None
+    assert get_model_index() is not index
+    assert table_to_class(Spam.__table__) is Spam
+
+
+def test_get_join():
+    relationship = sa.inspect(Reporter).relationships["pets"]
+    index = get_model_index()
+    assert index.get_join(relationship) is index.get_join(relationship)
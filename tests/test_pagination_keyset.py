@@ -0,0 +1,137 @@
+import graphene
+import pytest
+import sqlalchemy as sa
+from graphene import Context
+
+from .models import Editor
+from alchql.connection.keyset import cursor_to_keyset, get_keyset_keys
+from alchql.fields import FilterConnectionField
+from alchql.middlewares import LoaderMiddleware
+from alchql.node import AsyncNode
+from alchql.types import SQLAlchemyObjectType
+
+NAMES = ["b", None, "a", "c", "a", None, "b", "d"]
+
+
+async def add_test_data(session):
+    await session.execute(
+        sa.insert(Editor).values([{Editor.name: name} for name in NAMES])
+    )
+
+
+def get_schema(yield_per=None):
+    class EditorType(SQLAlchemyObjectType):
+        class Meta:
+            model = Editor
+            interfaces = (AsyncNode,)
+
+    class Query(graphene.ObjectType):
+        editors = FilterConnectionField(
+            EditorType,
+            sort=EditorType.sort_argument(),
+            keyset=True,
+            yield_per=yield_per,
+        )
+
+    return graphene.Schema(query=Query)
+
+
+def get_expected(descending):
+    rows = [(name, num + 1) for num, name in enumerate(NAMES)]
+    # NULL names go last, primary key ascending breaks the ties
+    present = sorted(
+        ((name, -pk if descending else pk) for name, pk in rows if name is not None),
+        reverse=descending,
+    )
+    return [abs(pk) for _, pk in present] + [pk for name, pk in rows if name is None]
+
+
+async def get_page(schema, session, sort, arguments):
+    result = await schema.execute_async(
+        """
+        query {
+          editors(sort: %s, %s) {
+            edges {
+              node {
+                editorId
+              }
+            }
+            pageInfo {
+              startCursor
+              endCursor
+              hasPreviousPage
+              hasNextPage
+            }
+          }
+        }
+        """
+        % (sort, arguments),
+        context_value=Context(session=session),
+        middleware=[LoaderMiddleware([Editor])],
+    )
+    assert not result.errors
+    editors = result.data["editors"]
+    return [int(i["node"]["editorId"]) for i in editors["edges"]], editors["pageInfo"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort, descending", [("NAME_ASC", False), ("NAME_DESC", True)])
+@pytest.mark.parametrize("yield_per", [None, 2])
+async def test_keyset_forward(session, sort, descending, yield_per):
+    await add_test_data(session)
+    schema = get_schema(yield_per)
+
+    ids, arguments, pages = [], "first: 3", 0
+    while True:
+        page, page_info = await get_page(schema, session, sort, arguments)
+        ids.extend(page)
+        pages += 1
+        assert page_info["hasPreviousPage"] == (pages > 1)
+        if not page_info["hasNextPage"]:
+            break
+        arguments = f'first: 3, after: "{page_info["endCursor"]}"'
+
+    assert pages == 3
+    assert ids == get_expected(descending)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort, descending", [("NAME_ASC", False), ("NAME_DESC", True)])
+@pytest.mark.parametrize("yield_per", [None, 2])
+async def test_keyset_backward(session, sort, descending, yield_per):
+    await add_test_data(session)
+    schema = get_schema(yield_per)
+
+    ids, arguments = [], "last: 3"
+    while True:
+        page, page_info = await get_page(schema, session, sort, arguments)
+        ids[:0] = page
+        if not page_info["hasPreviousPage"]:
+            break
+        assert len(page) == 3
+        arguments = f'last: 3, before: "{page_info["startCursor"]}"'
+
+    assert ids == get_expected(descending)
+
+
+@pytest.mark.asyncio
+async def test_keyset_cursor(session):
+    await add_test_data(session)
+    schema = get_schema()
+
+    page, page_info = await get_page(schema, session, "NAME_DESC", "first: 2")
+    assert page == [8, 4]
+
+    query = (
+        sa.select(Editor.editor_id)
+        .order_by(Editor.name.desc().nullslast())
+        .order_by(Editor.editor_id)
+    )
+    keys = get_keyset_keys(query, Editor)
+    assert [(key.descending, key.nulls_last) for key in keys] == [
+        (True, True),
+        (False, False),
+    ]
+    assert cursor_to_keyset(page_info["endCursor"], keys) == ["c", 4]
+    # offset cursors are ignored
+    assert cursor_to_keyset("YXJyYXljb25uZWN0aW9uOjA=", keys) is None
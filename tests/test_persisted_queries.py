@@ -0,0 +1,113 @@
+import json
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+import graphene
+import pytest
+
+from alchql import app as app_module
+from alchql.app import SessionQLApp
+from alchql.persisted_queries import get_query_hash, InProcessPersistedQueryStore
+
+QUERY = "query { hello }"
+
+
+class Query(graphene.ObjectType):
+    hello = graphene.String()
+
+    def resolve_hello(self, info):
+        return "world"
+
+
+class Mutation(graphene.ObjectType):
+    touch = graphene.String()
+
+    def resolve_touch(self, info):
+        return "touched"
+
+
+def get_extensions(query=QUERY):
+    return {"persistedQuery": {"version": 1, "sha256Hash": get_query_hash(query)}}
+
+
+async def call(app, method="POST", body=None, params=None):
+    async def receive():
+        return {"type": "http.request", "body": json.dumps(body).encode()}
+
+    response = {}
+
+    async def send(data):
+        if data["type"] == "http.response.start":
+            response["status"] = data["status"]
+        elif data["type"] == "http.response.body":
+            response["body"] = json.loads(data["body"])
+
+    await app(
+        scope={
+            "type": "http",
+            "method": method,
+            "headers": [(b"content-type", b"application/json")],
+            "query_string": urlencode(params or {}).encode(),
+        },
+        receive=receive,
+        send=send,
+    )
+    return response["status"], response["body"]
+
+
+def get_app(engine, **kwargs):
+    return SessionQLApp(
+        schema=graphene.Schema(query=Query, mutation=Mutation),
+        engine=engine,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_persisted_query(engine):
+    store = InProcessPersistedQueryStore()
+    app = get_app(engine, persisted_queries=store)
+
+    status, body = await call(app, body={"extensions": get_extensions()})
+    assert status == 200
+    assert body["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+
+    status, body = await call(
+        app, body={"query": QUERY, "extensions": get_extensions()}
+    )
+    assert (status, body) == (200, {"data": {"hello": "world"}})
+    assert store.info().currsize == 1
+
+    # known hashes are neither sent nor parsed again
+    with patch.object(app_module, "parse") as parse:
+        status, body = await call(app, body={"extensions": get_extensions()})
+    assert (status, body) == (200, {"data": {"hello": "world"}})
+    assert not parse.called
+
+
+@pytest.mark.asyncio
+async def test_persisted_query_get(engine):
+    app = get_app(engine)
+    await call(app, body={"query": QUERY, "extensions": get_extensions()})
+
+    params = {"extensions": json.dumps(get_extensions())}
+    status, body = await call(app, "GET", params=params)
+    assert (status, body) == (200, {"data": {"hello": "world"}})
+
+    mutation = "mutation { touch }"
+    params = {"query": mutation, "extensions": json.dumps(get_extensions(mutation))}
+    status, _ = await call(app, "GET", params=params)
+    assert status == 405
+
+
+@pytest.mark.asyncio
+async def test_persisted_query_errors(engine):
+    app = get_app(engine)
+    extensions = get_extensions("query { other }")
+    status, body = await call(app, body={"query": QUERY, "extensions": extensions})
+    assert status == 400
+    assert body["errors"][0]["message"] == "provided sha does not match query"
+
+    app = get_app(engine, persisted_queries=None)
+    status, body = await call(app, body={"extensions": get_extensions()})
+    assert body["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_SUPPORTED"
@@ -0,0 +1,132 @@
+import graphene
+import pytest
+import sqlalchemy as sa
+from graphene import Context
+
+from alchql.fields import BatchSQLAlchemyConnectionField, FilterConnectionField
+from alchql.gql_id import ResolvedGlobalId
+from alchql.middlewares import LoaderMiddleware
+from alchql.node import AsyncNode
+from alchql.projection import get_projection
+from alchql.records import SQLAlchemyRecord
+from alchql.types import SQLAlchemyObjectType
+from .models import Article, Reporter
+
+
+class ReporterType(SQLAlchemyObjectType):
+    class Meta:
+        model = Reporter
+        only_fields = ("id", "first_name")
+
+
+def test_projection():
+    keys = ("id", "first_name", "email", "_batch_key")
+    projection = get_projection(keys, ReporterType, exclude=("_batch_key",))
+    # columns of fields excluded from the type are not passed
+    assert projection.names == ("id", "first_name")
+
+    reporters = projection.all(
+        [(1, "John", "john@example.com", 10), (2, "Jane", None, 10)]
+    )
+    assert [(r.id, r.first_name) for r in reporters] == [(1, "John"), (2, "Jane")]
+    assert projection.values((3, "Bob", None, 11)) == {"id": 3, "first_name": "Bob"}
+
+    # compiled once per result keys
+    assert (
+        get_projection(list(keys), ReporterType, exclude=("_batch_key",)) is projection
+    )
+    assert get_projection(keys, ReporterType) is not projection
+
+
+def test_projection_of_table():
+    projection = get_projection(("id", "_row_number"), Reporter.__table__)
+    assert projection.names == ("id",)
+
+    projection = get_projection(("_row_number",), Reporter.__table__)
+    assert projection.names == ()
+    assert projection.values((1,)) == {}
+
+
+def test_projection_of_untyped_rows():
+    projection = get_projection(("first_name", "_total_count"), dict)
+    assert projection(("John", 1)) == {"first_name": "John", "_total_count": 1}
+
+
+def get_records_schema():
+    class ReporterType(SQLAlchemyObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (AsyncNode,)
+            slotted_records = True
+
+        full_name = graphene.String()
+
+        def resolve_full_name(self, info):
+            return f"{self.first_name} {self.last_name}"
+
+    class ArticleType(SQLAlchemyObjectType):
+        class Meta:
+            model = Article
+            interfaces = (AsyncNode,)
+            slotted_records = True
+            connection_field_factory = BatchSQLAlchemyConnectionField.from_relationship
+
+    class Query(graphene.ObjectType):
+        articles = FilterConnectionField(ArticleType, sort=None)
+
+    return graphene.Schema(query=Query), ArticleType
+
+
+def test_slotted_records():
+    _, ArticleType = get_records_schema()
+    projection = get_projection(("headline", "id"), ArticleType)
+    article = projection(("Article", 1))
+
+    assert isinstance(article, SQLAlchemyRecord)
+    assert not hasattr(article, "__dict__")
+    assert (article.id, article.headline, article.reporter_id) == (1, "Article", None)
+    assert ArticleType.is_type_of(article, None)
+
+
+@pytest.mark.asyncio
+async def test_slotted_records_query(session):
+    reporter_id = (
+        await session.execute(
+            sa.insert(Reporter).values({"first_name": "John", "last_name": "Doe"})
+        )
+    ).lastrowid
+    await session.execute(
+        sa.insert(Article).values({"headline": "Article", "reporter_id": reporter_id})
+    )
+    schema, _ = get_records_schema()
+
+    result = await schema.execute_async(
+        """
+        query {
+            articles {
+                edges {
+                    node {
+                        id
+                        headline
+                        reporter {
+                            id
+                            firstName
+                            lastName
+                            fullName
+                        }
+                    }
+                }
+            }
+        }
+        """,
+        context_value=Context(session=session),
+        middleware=[LoaderMiddleware([Article, Reporter])],
+    )
+
+    assert not result.errors
+    node = result.data["articles"]["edges"][0]["node"]
+    assert node["headline"] == "Article"
+    assert node["reporter"]["fullName"] == "John Doe"
+    assert ResolvedGlobalId.decode(node["reporter"]["id"]) == ResolvedGlobalId(
+        "ReporterType", reporter_id
+    )
@@ -212,6 +212,63 @@ async def test_query_node(session):
     assert result == expected
 
 
+@pytest.mark.asyncio
+async def test_query_root_node_relationship(session):
+    await add_test_data(session)
+
+    class ReporterNode(SQLAlchemyObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (AsyncNode,)
+
+    class ArticleNode(SQLAlchemyObjectType):
+        class Meta:
+            model = Article
+            interfaces = (AsyncNode,)
+
+    class Query(graphene.ObjectType):
+        node = AsyncNode.Field()
+
+    # loaders below the root `node` field share its per-request selection
+    query = """
+        query {
+          node(id: "UmVwb3J0ZXJOb2RlOjE=") {
+            ... on ReporterNode {
+              firstName
+              articles(first: 1) {
+                edges {
+                  node {
+                    headline
+                  }
+                }
+              }
+              favoriteArticle {
+                headline
+              }
+            }
+          }
+        }
+    """
+    expected = {
+        "node": {
+            "firstName": "John",
+            "articles": {"edges": [{"node": {"headline": "Hi!"}}]},
+            "favoriteArticle": {"headline": "Hi!"},
+        },
+    }
+    schema = graphene.Schema(query=Query, types=[ReporterNode, ArticleNode])
+    result = await schema.execute_async(
+        query,
+        context_value=Context(session=session),
+        middleware=[
+            LoaderMiddleware([Article, Reporter]),
+        ],
+    )
+    assert not result.errors
+    result = to_std_dicts(result.data)
+    assert result == expected
+
+
 @pytest.mark.asyncio
 async def test_orm_field(session):
     await add_test_data(session)
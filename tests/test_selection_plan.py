@@ -0,0 +1,387 @@
+import dataclasses
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import graphene
+import pytest
+import sqlalchemy as sa
+from graphene import Context
+from graphql import parse
+from graphql.pyutils import Path
+
+from alchql.consts import OP_EQ
+from alchql.fields import FilterConnectionField
+from alchql.gql_fields import get_fields
+from alchql.middlewares import LoaderMiddleware
+from alchql.node import AsyncNode
+from alchql.query_helper import QueryHelper
+from alchql.selection import (
+    compile_selection_plan,
+    get_selection_key,
+    PLAN_CACHE_SIZE,
+)
+from alchql.types import SQLAlchemyObjectType
+from .models import Editor, Reporter
+
+
+async def add_test_data(session):
+    await session.execute(
+        sa.insert(Editor).values([{Editor.name: f"Editor#{num}"} for num in range(5)])
+    )
+
+
+def get_schema():
+    class EditorType(SQLAlchemyObjectType):
+        class Meta:
+            model = Editor
+            interfaces = (AsyncNode,)
+            filter_fields = {
+                Editor.name: [OP_EQ],
+            }
+
+    class Query(graphene.ObjectType):
+        editors = FilterConnectionField(EditorType, sort=None)
+
+    return graphene.Schema(query=Query)
+
+
+@pytest.mark.asyncio
+async def test_plan_cache_binds_variables(session, raise_graphql):
+    await add_test_data(session)
+    QueryHelper.plan_cache.clear()
+
+    query = """
+    query Editors($name: String) {
+      editors(name_Eq: $name) {
+        edges {
+          node {
+            name
+          }
+        }
+      }
+    }
+    """
+
+    schema = get_schema()
+    for num in range(3):
+        result = await schema.execute_async(
+            query,
+            variable_values={"name": f"Editor#{num}"},
+            context_value=Context(session=session),
+            middleware=[LoaderMiddleware([Editor])],
+        )
+
+        assert not result.errors
+        assert result.data == {
+            "editors": {"edges": [{"node": {"name": f"Editor#{num}"}}]}
+        }
+
+    cache_info = QueryHelper.plan_cache.info()
+    assert cache_info.misses == 1
+    assert cache_info.hits == 2
+    assert cache_info.currsize == 1
+
+
+@pytest.mark.asyncio
+async def test_plan_cache_keys_by_document(session, raise_graphql):
+    await add_test_data(session)
+    QueryHelper.plan_cache.clear()
+
+    schema = get_schema()
+    for field in ("name", "editorId"):
+        result = await schema.execute_async(
+            f"""
+            query {{
+              editors(first: 1) {{
+                edges {{
+                  node {{
+                    {field}
+                  }}
+                }}
+              }}
+            }}
+            """,
+            context_value=Context(session=session),
+            middleware=[LoaderMiddleware([Editor])],
+        )
+
+        assert not result.errors
+        assert list(result.data["editors"]["edges"][0]["node"]) == [field]
+
+    cache_info = QueryHelper.plan_cache.info()
+    assert cache_info.misses == 2
+    assert cache_info.hits == 0
+
+
+@pytest.mark.asyncio
+async def test_plan_cache_is_not_modified_by_hooks(session, raise_graphql):
+    await add_test_data(session)
+    QueryHelper.plan_cache.clear()
+
+    seen = []
+
+    class EditorType(SQLAlchemyObjectType):
+        class Meta:
+            model = Editor
+            interfaces = (AsyncNode,)
+
+        @classmethod
+        async def set_select_from(cls, info, q, values):
+            seen.append([i.name for i in values])
+            values.clear()
+            return q
+
+    class Query(graphene.ObjectType):
+        editors = FilterConnectionField(EditorType, sort=None)
+
+    schema = graphene.Schema(query=Query)
+    for _ in range(2):
+        result = await schema.execute_async(
+            "query { editors(first: 1) { edges { node { name } } } }",
+            context_value=Context(session=session),
+            middleware=[LoaderMiddleware([Editor])],
+        )
+        assert not result.errors
+        assert result.data == {"editors": {"edges": [{"node": {"name": "Editor#0"}}]}}
+
+    assert seen == [["name"], ["name"]]
+    assert QueryHelper.plan_cache.info().hits == 1
+
+
+def test_plan_cache_resize():
+    QueryHelper.plan_cache.clear()
+    for i in range(3):
+        QueryHelper.plan_cache.set(i, i)
+
+    QueryHelper.set_plan_cache_size(2)
+    try:
+        assert len(QueryHelper.plan_cache) == 2
+        assert 0 not in QueryHelper.plan_cache
+    finally:
+        QueryHelper.set_plan_cache_size(PLAN_CACHE_SIZE)
+        QueryHelper.plan_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_multiple_roots_parse_once(session):
+    class EditorType(SQLAlchemyObjectType):
+        class Meta:
+            model = Editor
+            interfaces = (AsyncNode,)
+
+    class Query(graphene.ObjectType):
+        editors = FilterConnectionField(EditorType, sort=None)
+
+    await session.execute(
+        sa.insert(Editor).values([{Editor.name: f"Editor#{i}"} for i in range(10)])
+    )
+
+    roots = 5
+    query = "query {%s}" % " ".join(
+        f"e{i}: editors(first: {i + 1}) {{ pageInfo {{ hasNextPage }} edges {{ node {{ name }} }} }}"
+        for i in range(roots)
+    )
+    schema = graphene.Schema(query=Query)
+
+    with patch.object(
+        QueryHelper, "get_selection_plan", wraps=QueryHelper.get_selection_plan
+    ) as get_selection_plan:
+        result = await schema.execute_async(
+            query,
+            context_value=Context(session=session),
+            middleware=[LoaderMiddleware([Editor])],
+        )
+
+    assert not result.errors
+    # one parse per root field, not one per switch between roots
+    assert get_selection_plan.call_count == roots
+
+
+CURRENT_FIELD_QUERY = """
+query Reporters($first: Int) {
+  items: reporters(first: $first) {
+    totalCount
+    edges {
+      node {
+        firstName
+        latest: articles(first: 1) {
+          edges {
+            node {
+              headline
+            }
+          }
+        }
+        ...ReporterPets
+      }
+    }
+  }
+}
+
+fragment ReporterPets on ReporterType {
+  pets(first: 2) {
+    edges {
+      node {
+        name
+      }
+    }
+  }
+}
+"""
+
+
+def get_info(keys, variable_values=None, context=None):
+    document = parse(CURRENT_FIELD_QUERY)
+    operation, fragment = document.definitions
+
+    path = Path(None, "items", "Query")
+    for key, typename in keys:
+        path = path.add_key(key, typename)
+
+    return SimpleNamespace(
+        context=context or SimpleNamespace(),
+        field_name=path.key,
+        field_nodes=operation.selection_set.selections,
+        fragments={fragment.name.value: fragment},
+        operation=operation,
+        path=path,
+        variable_values=variable_values or {},
+    )
+
+
+REPORTER_NODE = [
+    ("edges", "ReporterTypeConnection"),
+    (0, None),
+    ("node", "ReporterTypeEdge"),
+]
+ARTICLE_NODE = [
+    ("latest", "ReporterType"),
+    ("edges", "ArticleTypeConnection"),
+    (3, None),
+    ("node", "ArticleTypeEdge"),
+]
+
+
+@pytest.mark.parametrize(
+    "keys, name, alias, arguments",
+    [
+        ([], "reporters", "items", {"first": 5}),
+        (REPORTER_NODE, "reporters", "items", {"first": 5}),
+        (REPORTER_NODE + [("firstName", "ReporterType")], "first_name", None, {}),
+        (
+            REPORTER_NODE + [("latest", "ReporterType")],
+            "articles",
+            "latest",
+            {"first": "1"},
+        ),
+        (
+            REPORTER_NODE + ARTICLE_NODE + [("headline", "ArticleType")],
+            "headline",
+            None,
+            {},
+        ),
+        (REPORTER_NODE + [("pets", "ReporterType")], "pets", None, {"first": "2"}),
+        (
+            REPORTER_NODE + [("missing", "ReporterType")],
+            "reporters",
+            "items",
+            {"first": 5},
+        ),
+    ],
+)
+def test_get_current_field(keys, name, alias, arguments):
+    QueryHelper.plan_cache.clear()
+    info = get_info(keys, variable_values={"first": 5})
+
+    current_field = QueryHelper.get_current_field(info)
+    assert current_field.name == name
+    assert current_field.alias == alias
+    assert current_field.arguments == arguments
+
+
+def test_get_current_field_index_is_shared_by_bound_plans():
+    QueryHelper.plan_cache.clear()
+    keys = REPORTER_NODE + ARTICLE_NODE + [("headline", "ArticleType")]
+
+    first = get_info(keys, variable_values={"first": 1})
+    second = get_info(keys, variable_values={"first": 2})
+    assert QueryHelper.get_current_field(first).name == "headline"
+    assert QueryHelper.get_current_field(second).name == "headline"
+
+    first_plan = QueryHelper.get_request_plan(first)
+    second_plan = QueryHelper.get_request_plan(second)
+    assert first_plan.fields is not second_plan.fields
+    assert first_plan.index is second_plan.index
+    assert first_plan.fields[0].arguments == {"first": 1}
+    assert second_plan.fields[0].arguments == {"first": 2}
+    assert QueryHelper.plan_cache.info().hits == 1
+
+
+def test_get_fields_of_connection():
+    document = parse(
+        """
+        query {
+          reporters {
+            totalCount
+            pageInfo {
+              hasNextPage
+            }
+            edges {
+              node {
+                firstName
+                ... on ReporterType {
+                  email
+                }
+              }
+            }
+          }
+        }
+        """
+    )
+    (operation,) = document.definitions
+    info = SimpleNamespace(
+        field_nodes=operation.selection_set.selections,
+        fragments={},
+        operation=operation,
+        path=Path(None, "reporters", "Query"),
+    )
+
+    # connection fields are skipped, the node selection is used
+    fields = get_fields(Reporter, info, "ReporterType")
+    assert sorted(i.key for i in fields) == ["email", "first_name", "id"]
+
+
+def test_compile_selection_plan_keeps_root_node():
+    document = parse('query { node(id: "1") { ... on ReporterType { email } } }')
+    (operation,) = document.definitions
+
+    plan = compile_selection_plan(
+        operation.selection_set.selections, {}, "ReporterType"
+    )
+    (node,) = plan.fields
+    assert node.name == "node"
+    assert node.arguments == {"id": "1"}
+    assert [i.name for i in node.values] == ["email"]
+
+
+def test_compile_selection_plan_keeps_aliases():
+    document = parse(
+        """
+        query {
+          reporters {
+            first: articles(first: 1) { edges { node { headline } } }
+            last: articles(last: 1) { edges { node { id } } }
+          }
+        }
+        """
+    )
+    (operation,) = document.definitions
+
+    plan = compile_selection_plan(operation.selection_set.selections, {})
+    (reporters,) = plan.fields
+    first, last = reporters.values
+    assert (first.alias, first.arguments) == ("first", {"first": "1"})
+    assert (last.alias, last.arguments) == ("last", {"last": "1"})
+    assert get_selection_key(first) != get_selection_key(last)
+    assert get_selection_key(first) == get_selection_key(
+        dataclasses.replace(first, alias="other")
+    )
@@ -0,0 +1,107 @@
+import graphene
+import pytest
+import sqlalchemy as sa
+from graphene import Context
+
+from alchql.fields import FilterConnectionField
+from alchql.middlewares import LoaderMiddleware
+from alchql.node import AsyncNode
+from alchql.statement_stats import statement_stats, StatementCacheInfo
+from alchql.types import SQLAlchemyObjectType
+from .models import Article, Reporter
+
+
+@pytest.fixture
+def stats():
+    statement_stats.clear()
+    statement_stats.enable()
+    yield statement_stats
+    statement_stats.disable()
+    statement_stats.clear()
+
+
+async def add_test_data(session):
+    for num in range(2):
+        reporter_id = (
+            await session.execute(
+                sa.insert(Reporter).values(
+                    {Reporter.first_name: f"John{num}", Reporter.email: "email"}
+                )
+            )
+        ).lastrowid
+        await session.execute(
+            sa.insert(Article).values(
+                {Article.headline: f"Hi{num}!", Article.reporter_id: reporter_id}
+            )
+        )
+
+
+def get_schema():
+    class ReporterType(SQLAlchemyObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (AsyncNode,)
+
+    class ArticleType(SQLAlchemyObjectType):
+        class Meta:
+            model = Article
+            interfaces = (AsyncNode,)
+
+    class Query(graphene.ObjectType):
+        reporters = FilterConnectionField(ReporterType, sort=None)
+
+    return graphene.Schema(query=Query, types=[ArticleType])
+
+
+@pytest.mark.asyncio
+async def test_statement_stats(session, stats):
+    await add_test_data(session)
+    schema = get_schema()
+
+    # the same selection in another order builds the same statement
+    for fields in ("firstName email", "email firstName"):
+        result = await schema.execute_async(
+            """
+            query {
+              reporters(first: 2) {
+                edges {
+                  node {
+                    %s
+                    articles {
+                      edges {
+                        node {
+                          headline
+                        }
+                      }
+                    }
+                  }
+                }
+              }
+            }
+            """
+            % fields,
+            context_value=Context(session=session),
+            middleware=[LoaderMiddleware([Article, Reporter])],
+        )
+        assert not result.errors
+
+    assert stats.info() == {
+        "connection:Query.reporters": StatementCacheInfo(hits=1, misses=1, uncached=0),
+        "loader:ReporterType.articles": StatementCacheInfo(
+            hits=1, misses=1, uncached=0
+        ),
+    }
+
+
+@pytest.mark.asyncio
+async def test_statement_stats_disabled(session, stats):
+    await add_test_data(session)
+    stats.disable()
+
+    result = await get_schema().execute_async(
+        "query { reporters(first: 1) { edges { node { firstName } } } }",
+        context_value=Context(session=session),
+        middleware=[LoaderMiddleware([Article, Reporter])],
+    )
+    assert not result.errors
+    assert stats.info() == {}
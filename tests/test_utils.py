@@ -1,11 +1,19 @@
 import pytest
-from graphene import Context, ObjectType, Schema, String
+from graphene import Context, Dynamic, Field, ID, List, ObjectType, Schema, String
 
+from alchql import gql_types
+from alchql.fields import ModelField
 from alchql.gql_fields import camel_to_snake
+from alchql.gql_id import ResolvedGlobalId
+from alchql.types import SQLAlchemyObjectType
 from alchql.utils import (
+    get_filter_decoder,
+    get_object_type_manual_fields,
+    get_object_type_select_map,
     to_enum_value_name,
     to_type_name,
 )
+from .models import Article, Reporter
 
 
 @pytest.mark.asyncio
@@ -56,3 +64,67 @@ def test_to_enum_value_name():
     assert to_enum_value_name("makeEnumValueName") == "MAKE_ENUM_VALUE_NAME"
     assert to_enum_value_name("HTTPStatus400Message") == "HTTP_STATUS400_MESSAGE"
     assert to_enum_value_name("ALREADY_ENUM_VALUE_NAME") == "ALREADY_ENUM_VALUE_NAME"
+
+
+def test_get_object_type_select_map():
+    class ReporterType(SQLAlchemyObjectType):
+        class Meta:
+            model = Reporter
+
+    class ArticleType(SQLAlchemyObjectType):
+        class Meta:
+            model = Article
+
+        title = gql_types.String(model_field=Article.headline)
+        author_id = ModelField(String, model_field=Article.reporter_id, use_label=False)
+
+    select_map = get_object_type_select_map(ArticleType, Article)
+
+    assert [i.key for i in select_map["headline"]] == ["headline"]
+    # relationships select their local key
+    assert [i.key for i in select_map["reporter"]] == ["reporter_id"]
+    # labels are skipped with use_label=False
+    assert [i.key for i in select_map["author_id"]] == ["reporter_id"]
+    (title,) = select_map["title"]
+    assert title.name == "title"
+    assert title.element.key == "headline"
+
+    assert get_object_type_select_map(ArticleType, Article) is select_map
+    assert get_object_type_manual_fields(ArticleType) is get_object_type_manual_fields(
+        ArticleType
+    )
+    with pytest.raises(TypeError):
+        select_map["headline"] = ()
+
+
+def test_get_object_type_select_map_unresolved_dynamic(caplog):
+    class ArticleType(SQLAlchemyObjectType):
+        class Meta:
+            model = Article
+
+        editor = Dynamic(lambda: Field(String))
+
+    # ReporterType is not registered yet, the map is not cached
+    select_map = get_object_type_select_map(ArticleType, Article)
+    assert "reporter" not in select_map
+    assert get_object_type_select_map(ArticleType, Article) is not select_map
+
+    class ReporterType(SQLAlchemyObjectType):
+        class Meta:
+            model = Reporter
+
+    select_map = get_object_type_select_map(ArticleType, Article)
+    assert [i.key for i in select_map["reporter"]] == ["reporter_id"]
+    # relationships without a local key are kept, and only logged when selected
+    assert select_map["editor"] == ()
+    assert not caplog.records
+    assert get_object_type_select_map(ArticleType, Article) is select_map
+
+
+def test_get_filter_decoder():
+    global_id = ResolvedGlobalId("ReporterType", 1).encode()
+
+    assert get_filter_decoder(ID)(global_id) == 1
+    assert get_filter_decoder(List(of_type=ID))([global_id, global_id]) == [1, 1]
+    assert get_filter_decoder(String, lambda v: f"%{v}%")("name") == "%name%"
+    assert get_filter_decoder(List(of_type=String))(["a", "b"]) == ["a", "b"]